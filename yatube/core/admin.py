@@ -0,0 +1,18 @@
+from django.contrib import admin
+
+from .models import PeriodicTask, Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'name', 'status', 'priority', 'attempts', 'run_at', 'finished',
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'last_error')
+    empty_value_display = '-пусто-'
+
+
+@admin.register(PeriodicTask)
+class PeriodicTaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'next_run')
@@ -0,0 +1,29 @@
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import MemcachedCache
+
+from .metrics import record_cache
+
+_missing = object()
+
+
+class InstrumentedCacheMixin:
+    """Считает попадания и промахи запроса."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        record_cache(value is not _missing)
+        return default if value is _missing else value
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    """get_many базового класса вызывает get, поэтому учитывается тоже."""
+
+
+class InstrumentedMemcachedCache(InstrumentedCacheMixin, MemcachedCache):
+    """get_many здесь — один запрос к memcached, ключи считаются по одному."""
+
+    def get_many(self, keys, version=None):
+        found = super().get_many(keys, version)
+        for key in keys:
+            record_cache(key in found)
+        return found
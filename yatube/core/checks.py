@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Warning, register
+
+
+@register()
+def tasks_cache_check(app_configs, **kwargs):
+    """Исполнители задач без общего кэша меняют версии лент впустую."""
+    if settings.TASKS_EAGER or not isinstance(caches['default'], LocMemCache):
+        return []
+    return [Warning(
+        'Фоновые задачи выполняются исполнителями, а кэш — LocMemCache.',
+        hint=(
+            'Версии лент, измененные исполнителем, не увидят веб-процессы. '
+            'Задайте CACHE_LOCATION или TASKS_EAGER = True.'
+        ),
+        id='core.W001',
+    )]
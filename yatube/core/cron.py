@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+# Поля cron-выражения: минута, час, день месяца, месяц, день недели.
+FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+# Дальше года вперед совпадения не ищутся: выражение вроде 30 февраля.
+HORIZON = timedelta(days=366)
+
+
+def parse_field(field, low, high):
+    values = set()
+    for part in field.split(','):
+        part, _, step = part.partition('/')
+        if part == '*':
+            start, stop = low, high
+        elif '-' in part:
+            start, stop = map(int, part.split('-'))
+        else:
+            start = stop = int(part)
+            if step:
+                stop = high
+        if not low <= start <= stop <= high:
+            raise ValueError(f'Значение вне {low}-{high}: {field}')
+        values.update(range(start, stop + 1, int(step or 1)))
+    return values
+
+
+def parse(expression):
+    """Множества допустимых значений каждого поля cron-выражения.
+
+    Поддерживаются ``*``, числа, диапазоны ``a-b``, шаги ``*/n`` и
+    списки через запятую. Воскресенье — 0. Если ограничены и день
+    месяца, и день недели, должны совпасть оба.
+    """
+    fields = expression.split()
+    if len(fields) != len(FIELDS):
+        raise ValueError(f'Нужно пять полей: {expression}')
+    return [
+        parse_field(field, low, high)
+        for field, (low, high) in zip(fields, FIELDS)
+    ]
+
+
+def next_run(expression, after):
+    """Ближайшая минута позже ``after``, подходящая под выражение."""
+    minutes, hours, days, months, weekdays = parse(expression)
+    moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    limit = moment + HORIZON
+    while moment < limit:
+        if moment.month not in months:
+            moment = (moment.replace(day=1, hour=0, minute=0)
+                      + timedelta(days=32)).replace(day=1)
+        elif (moment.day not in days
+              or moment.isoweekday() % 7 not in weekdays):
+            moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+        elif moment.hour not in hours:
+            moment = moment.replace(minute=0) + timedelta(hours=1)
+        elif moment.minute not in minutes:
+            moment += timedelta(minutes=1)
+        else:
+            return moment
+    raise ValueError(f'Выражение не срабатывает в течение года: {expression}')
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from . import replicas
+
+
+class ReplicaRouter:
+    """Чтение в view с ``replica_reads`` - с реплик, запись - в default.
+
+    С реплик читаются только модели из REPLICA_APPS: сессии и служебные
+    таблицы всегда берутся из основной базы.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in settings.REPLICA_APPS:
+            return None
+        return replicas.choose()
+
+    def db_for_write(self, model, **hints):
+        replicas.mark_write()
+        # Без явного ответа Django пишет туда, откуда объект прочитан,
+        # то есть в реплику.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas.aliases()}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replicas.aliases():
+            return False
+        return None
@@ -0,0 +1,107 @@
+import os
+import signal
+import socket
+import threading
+from multiprocessing import Process
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils.module_loading import autodiscover_modules
+
+from core import tasks
+
+
+def work(worker, stop, poll, once):
+    """Цикл одного потока: берет задачи, пока очередь не опустеет."""
+    try:
+        while not stop.is_set():
+            job = tasks.claim(worker)
+            if job is not None:
+                tasks.execute(job)
+            elif once:
+                return
+            else:
+                stop.wait(poll)
+    finally:
+        connections.close_all()
+
+
+def serve(threads, poll, once, stdout=None):
+    """Потоки-исполнители и расписание в одном процессе."""
+    stop = threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        for number in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(number, lambda *args: stop.set())
+    prefix = f'{socket.gethostname()}:{os.getpid()}'
+    tasks.release_stale()
+    tasks.run_schedule()
+    workers = [
+        threading.Thread(
+            target=work, args=(f'{prefix}:{number}', stop, poll, once),
+            name=f'worker-{number}',
+        )
+        for number in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    while not once and not stop.wait(poll):
+        tasks.release_stale()
+        started = tasks.run_schedule()
+        if started and stdout is not None:
+            stdout.write(f'По расписанию: {", ".join(started)}')
+    for worker in workers:
+        worker.join()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые задачи из очереди в базе: повторы с растущей '
+        'паузой, приоритеты и запуск по расписанию TASK_SCHEDULE.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=2,
+            help='Потоков в каждом процессе.'
+        )
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Процессов; тяжелая работа с картинками делится по ним.'
+        )
+        parser.add_argument(
+            '--poll', type=float, default=1.0,
+            help='Пауза в секундах, когда очередь пуста.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти.'
+        )
+
+    def handle(self, *args, **options):
+        autodiscover_modules('tasks')
+        self.stdout.write(
+            f'Зарегистрировано задач: {len(tasks.registry)}, процессов: '
+            f'{options["processes"]}, потоков: {options["workers"]}'
+        )
+        arguments = (options['workers'], options['poll'], options['once'])
+        if options['processes'] == 1:
+            serve(*arguments, self.stdout)
+        else:
+            # Дочерние процессы создаются форком и не должны
+            # унаследовать открытое соединение с базой.
+            connections.close_all()
+            children = [
+                Process(target=serve, args=arguments)
+                for _ in range(options['processes'])
+            ]
+            for child in children:
+                child.start()
+            try:
+                for child in children:
+                    child.join()
+            except KeyboardInterrupt:
+                for child in children:
+                    child.terminate()
+                    child.join()
+        self.stdout.write(self.style.SUCCESS('Исполнители остановлены'))
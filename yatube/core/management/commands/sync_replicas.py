@@ -0,0 +1,40 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core import replicas
+
+
+def copy_sqlite(source, target):
+    """Копирует базу через backup API.
+
+    Копия согласована, даже если в основную базу в это время пишут.
+    """
+    source_db = sqlite3.connect(source)
+    target_db = sqlite3.connect(target)
+    try:
+        source_db.backup(target_db)
+    finally:
+        target_db.close()
+        source_db.close()
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную SQLite-базу в файлы реплик REPLICA_DATABASES.'
+
+    def handle(self, *args, **options):
+        if not replicas.aliases():
+            raise CommandError('Реплики не настроены: REPLICA_DATABASES пуст')
+        source = connections[DEFAULT_DB_ALIAS].settings_dict
+        for alias in replicas.aliases():
+            target = connections[alias].settings_dict
+            if not all('sqlite3' in db['ENGINE'] for db in (source, target)):
+                raise CommandError(
+                    'Копировать можно только SQLite, остальные реплики '
+                    'синхронизирует сама СУБД'
+                )
+            connections[alias].close()
+            copy_sqlite(source['NAME'], target['NAME'])
+            self.stdout.write(f'{alias}: {target["NAME"]}')
+        self.stdout.write(self.style.SUCCESS('Реплики обновлены'))
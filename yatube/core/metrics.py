@@ -0,0 +1,136 @@
+import math
+import time
+from collections import deque
+from contextvars import ContextVar
+from threading import Lock
+
+# Сколько последних запросов каждого view хранится для процентилей.
+WINDOW = 1000
+
+current = ContextVar('request_metrics', default=None)
+
+
+class QueryTimer:
+    """Обертка execute_wrapper: считает запросы и их точное время."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def percentile(values, percent):
+    """Процентиль по ближайшему рангу."""
+    values = sorted(values)
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.view = None
+        self.seconds = 0.0
+        self.queries = QueryTimer()
+        self.template_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def server_timing(self):
+        return ', '.join((
+            f'view;desc="{self.view or "-"}"',
+            f'total;dur={self.seconds * 1000:.2f}',
+            f'sql;dur={self.queries.seconds * 1000:.2f};'
+            f'desc="{self.queries.count} queries"',
+            f'tpl;dur={self.template_seconds * 1000:.2f}',
+            f'cache;desc="hits={self.cache_hits} misses={self.cache_misses}"',
+        ))
+
+
+def record_template(seconds):
+    request_metrics = current.get()
+    if request_metrics is not None:
+        request_metrics.template_seconds += seconds
+
+
+def record_cache(hit):
+    request_metrics = current.get()
+    if request_metrics is None:
+        return
+    if hit:
+        request_metrics.cache_hits += 1
+    else:
+        request_metrics.cache_misses += 1
+
+
+class ViewStats:
+    def __init__(self, window):
+        self.requests = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.template_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.recent = deque(maxlen=window)
+
+    def add(self, request_metrics):
+        self.requests += 1
+        self.seconds += request_metrics.seconds
+        self.queries += request_metrics.queries.count
+        self.query_seconds += request_metrics.queries.seconds
+        self.template_seconds += request_metrics.template_seconds
+        self.cache_hits += request_metrics.cache_hits
+        self.cache_misses += request_metrics.cache_misses
+        self.recent.append(request_metrics.seconds * 1000)
+
+    def summary(self):
+        return {
+            'requests': self.requests,
+            'mean_ms': round(self.seconds * 1000 / self.requests, 3),
+            'p50_ms': round(percentile(self.recent, 50), 3),
+            'p95_ms': round(percentile(self.recent, 95), 3),
+            'p99_ms': round(percentile(self.recent, 99), 3),
+            'sql_queries': round(self.queries / self.requests, 2),
+            'sql_ms': round(self.query_seconds * 1000 / self.requests, 3),
+            'template_ms': round(
+                self.template_seconds * 1000 / self.requests, 3
+            ),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+
+class Aggregator:
+    """Сводка по view внутри процесса: суммы и окно последних запросов."""
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._lock = Lock()
+        self._views = {}
+
+    def add(self, request_metrics):
+        view = request_metrics.view or '-'
+        with self._lock:
+            stats = self._views.get(view)
+            if stats is None:
+                stats = self._views[view] = ViewStats(self.window)
+            stats.add(request_metrics)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                view: stats.summary() for view, stats in self._views.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+aggregator = Aggregator()
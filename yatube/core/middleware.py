@@ -0,0 +1,73 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, replicas
+
+PRIMARY_COOKIE = 'db_primary_until'
+
+
+class ServerTimingMiddleware:
+    """Замеряет запрос и отдает замеры в заголовке Server-Timing.
+
+    Время и число SQL-запросов, время шаблонов и попадания в кэш
+    копятся в ``metrics.current``, итог уходит в ``metrics.aggregator``.
+    Запросы потоковых ответов, выполненные после возврата view, не
+    учитываются.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_metrics = metrics.RequestMetrics()
+        token = metrics.current.set(request_metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(request_metrics.queries)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        request_metrics.seconds = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            request_metrics.view = match.view_name
+        response['Server-Timing'] = request_metrics.server_timing()
+        metrics.aggregator.add(request_metrics)
+        return response
+
+
+class ReplicaStickinessMiddleware:
+    """Read-your-writes: после записи клиент читает из основной базы.
+
+    Пока реплики догоняют основную базу, клиент видит свои изменения.
+    Срок хранится в cookie, поэтому работает и для анонимов.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            pinned = int(request.COOKIES.get(PRIMARY_COOKIE, 0)) > time.time()
+        except ValueError:
+            pinned = False
+        request_state = replicas.RequestState(pinned)
+        token = replicas.state.set(request_state)
+        try:
+            response = self.get_response(request)
+        finally:
+            replicas.state.reset(token)
+        if request_state.wrote and replicas.aliases():
+            window = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                PRIMARY_COOKIE, str(int(time.time()) + window),
+                max_age=window, httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,52 @@
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+_reads = ContextVar('replica_reads', default=False)
+state = ContextVar('replica_state', default=None)
+
+
+class RequestState:
+    def __init__(self, pinned=False):
+        # Клиент недавно писал в базу и должен видеть свои изменения.
+        self.pinned = pinned
+        self.wrote = False
+
+
+def aliases():
+    return settings.REPLICA_DATABASES
+
+
+def in_use():
+    """Читает ли текущий код с реплик."""
+    request_state = state.get()
+    return bool(
+        _reads.get() and aliases()
+        and not (request_state and request_state.pinned)
+    )
+
+
+def choose():
+    if not in_use():
+        return None
+    return random.choice(aliases())
+
+
+def mark_write():
+    request_state = state.get()
+    if request_state is not None:
+        request_state.wrote = True
+
+
+def replica_reads(view):
+    """Разрешает view читать модели из REPLICA_APPS с реплик."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = _reads.set(True)
+        try:
+            return view(*args, **kwargs)
+        finally:
+            _reads.reset(token)
+    return wrapper
@@ -0,0 +1,157 @@
+import json
+import logging
+import traceback
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import cron
+from .models import PeriodicTask, Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def enqueue(name, args=(), kwargs=None, priority=None, delay=None):
+    """Ставит задачу в очередь в текущей транзакции.
+
+    Задача видна исполнителям только после коммита, поэтому может
+    ссылаться на только что созданные объекты. Аргументы — JSON.
+    При TASKS_EAGER задача выполняется сразу после коммита.
+    """
+    function = registry[name]
+    kwargs = kwargs or {}
+    if settings.TASKS_EAGER:
+        transaction.on_commit(lambda: function(*args, **kwargs))
+        return None
+    return Task.objects.create(
+        name=name,
+        arguments=json.dumps({'args': list(args), 'kwargs': kwargs}),
+        priority=function.priority if priority is None else priority,
+        max_attempts=function.max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay or 0),
+    )
+
+
+def task(priority=0, max_attempts=3):
+    """Регистрирует функцию как фоновую задачу.
+
+    Имя задачи — модуль и имя функции. ``function.delay(*args,
+    **kwargs)`` ставит ее в очередь, прямой вызов выполняет сразу.
+    """
+    def decorator(function):
+        name = f'{function.__module__}.{function.__qualname__}'
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            return function(*args, **kwargs)
+
+        wrapper.priority = priority
+        wrapper.max_attempts = max_attempts
+        wrapper.delay = lambda *args, **kwargs: enqueue(name, args, kwargs)
+        registry[name] = wrapper
+        return wrapper
+    return decorator
+
+
+def claim(worker):
+    """Забирает самую приоритетную готовую задачу или возвращает None.
+
+    Захват — условный UPDATE, поэтому одну задачу не возьмут два
+    исполнителя даже без SELECT FOR UPDATE.
+    """
+    while True:
+        now = timezone.now()
+        candidate = Task.objects.filter(
+            status=Task.QUEUED, run_at__lte=now
+        ).order_by('-priority', 'run_at', 'pk').values_list(
+            'pk', flat=True
+        ).first()
+        if candidate is None:
+            return None
+        claimed = Task.objects.filter(
+            pk=candidate, status=Task.QUEUED
+        ).update(
+            status=Task.RUNNING, locked_by=worker, locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Task.objects.get(pk=candidate)
+
+
+def retry_delay(attempts):
+    """Экспоненциальная пауза перед повтором, в секундах."""
+    return settings.TASK_RETRY_DELAY * 2 ** (attempts - 1)
+
+
+def execute(job):
+    """Выполняет задачу; при ошибке откладывает повтор или сдается."""
+    try:
+        function = registry[job.name]
+        arguments = json.loads(job.arguments)
+        function(*arguments['args'], **arguments['kwargs'])
+    except Exception:
+        logger.exception('Задача %s (%s) упала', job.pk, job.name)
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Task.QUEUED
+            job.run_at = timezone.now() + timedelta(
+                seconds=retry_delay(job.attempts)
+            )
+        else:
+            job.status = Task.FAILED
+            job.finished = timezone.now()
+    else:
+        job.status = Task.DONE
+        job.finished = timezone.now()
+    job.locked_by = ''
+    job.save(update_fields=[
+        'status', 'run_at', 'finished', 'last_error', 'locked_by'
+    ])
+    return job.status == Task.DONE
+
+
+def release_stale():
+    """Возвращает в очередь задачи исполнителей, которые упали."""
+    deadline = timezone.now() - timedelta(seconds=settings.TASK_LOCK_TIMEOUT)
+    return Task.objects.filter(
+        status=Task.RUNNING, locked_at__lt=deadline
+    ).update(status=Task.QUEUED, locked_by='')
+
+
+def run_schedule(now=None):
+    """Ставит в очередь задачи TASK_SCHEDULE, время которых пришло.
+
+    Следующий запуск сдвигается условным UPDATE, так что при
+    нескольких исполнителях задача ставится один раз.
+    """
+    now = timezone.localtime(now or timezone.now())
+    started = []
+    for name, entry in settings.TASK_SCHEDULE.items():
+        periodic, _ = PeriodicTask.objects.get_or_create(
+            name=name,
+            defaults={'next_run': cron.next_run(entry['cron'], now)},
+        )
+        if periodic.next_run > now:
+            continue
+        moved = PeriodicTask.objects.filter(
+            pk=periodic.pk, next_run=periodic.next_run
+        ).update(next_run=cron.next_run(entry['cron'], now))
+        if moved:
+            enqueue(entry['task'], entry.get('args', ()))
+            started.append(name)
+    return started
+
+
+@task(priority=-10)
+def purge_tasks():
+    """Удаляет выполненные задачи старше TASK_KEEP_DAYS."""
+    Task.objects.filter(
+        status=Task.DONE,
+        finished__lt=timezone.now() - timedelta(days=settings.TASK_KEEP_DAYS),
+    ).delete()
@@ -0,0 +1,105 @@
+from django.conf import settings
+from django.db.models import Q
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+
+from core.replicas import replica_reads
+
+from .caching import group_feed, post_feed, profile_feed
+from .conditional import feed_condition, following_feeds
+from .models import Group, Post, User
+from .timelines import timeline_posts
+from .utils import KeysetPaginator, decode_cursor, encode_cursor
+
+
+def serialize_post(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'pub_date': post.pub_date.isoformat(),
+        'image': post.image.url if post.image else None,
+        'comments_count': post.comments_count,
+    }
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.pk,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data, status=status, json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def feed_response(posts, request):
+    page = KeysetPaginator(
+        posts.select_related('author', 'group'), settings.NUMBER_OF_POSTS
+    ).get_page(request.GET)
+    return json_response({
+        'results': [serialize_post(post) for post in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@replica_reads
+@feed_condition(lambda request: ['index'])
+def index(request):
+    return feed_response(Post.objects.all(), request)
+
+
+@replica_reads
+@feed_condition(lambda request, slug: [group_feed(slug)])
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(group.posts.all(), request)
+
+
+@replica_reads
+@feed_condition(lambda request, username: [profile_feed(username)])
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_response(author.posts.all(), request)
+
+
+@replica_reads
+@feed_condition(lambda request, post_id: [post_feed(post_id)])
+def post_detail(request, post_id):
+    """Пост и страница комментариев по курсору ``after``."""
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id
+    )
+    comments = post.comments.select_related('author').order_by(
+        'created', 'pk'
+    )
+    cursor = decode_cursor(request.GET.get('after'))
+    if cursor is not None:
+        created, pk = cursor
+        comments = comments.filter(
+            Q(created__gt=created) | Q(created=created, pk__gt=pk)
+        )
+    comments = list(comments[:settings.NUMBER_OF_COMMENTS + 1])
+    has_next = len(comments) > settings.NUMBER_OF_COMMENTS
+    comments = comments[:settings.NUMBER_OF_COMMENTS]
+    data = serialize_post(post)
+    data['comments'] = [serialize_comment(comment) for comment in comments]
+    data['next'] = (
+        encode_cursor(comments[-1], 'created') if has_next else None
+    )
+    return json_response(data)
+
+
+@replica_reads
+@feed_condition(following_feeds, per_user=True)
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return json_response({'detail': 'Нужно войти'}, status=401)
+    return feed_response(timeline_posts(request.user), request)
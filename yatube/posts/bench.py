@@ -0,0 +1,241 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    override_settings, setup_test_environment, teardown_test_environment
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from core.metrics import QueryTimer, percentile
+
+from . import urls
+from .importer import Importer
+from .models import Group, Post, User
+
+WORDS = (
+    'матрица нео тринити морфиус агент смит зион оракул пилюля кролик '
+    'нора ложка выбор путь код сон реальность корабль город машина'
+).split()
+
+# Параметры адресов, которые подставляются в каждый маршрут posts.
+SAMPLE_KIND = 'posts'
+SAMPLE_FORMAT = 'jsonl'
+
+
+def username(number):
+    return f'bench{number}'
+
+
+def text(rng, words=20):
+    return ' '.join(rng.choices(WORDS, k=words))
+
+
+def post_rows(rng, names, slugs, posts_per_author):
+    start = timezone.now()
+    # Авторы чередуются, чтобы их посты были размазаны по ленте.
+    for number in range(len(names) * posts_per_author):
+        yield {
+            'author': names[number % len(names)],
+            'group': rng.choice(slugs) if slugs and number % 2 else '',
+            'text': text(rng),
+            'pub_date': (start - timedelta(minutes=number)).isoformat(),
+        }
+
+
+def comment_rows(rng, names, comments_per_post):
+    post_ids = Post.objects.order_by('pk').values_list('pk', flat=True)
+    for post_id in post_ids.iterator():
+        for _ in range(comments_per_post):
+            yield {
+                'post': post_id,
+                'author': rng.choice(names),
+                'text': text(rng, 8),
+            }
+
+
+def follow_rows(rng, names, follows_per_user):
+    for number, name in enumerate(names):
+        others = names[:number] + names[number + 1:]
+        for author in rng.sample(others, min(follows_per_user, len(others))):
+            yield {'user': name, 'author': author}
+
+
+def seed(users=100, posts_per_author=20, follows_per_user=10,
+         comments_per_post=2, groups=10, random_seed=0, stdout=None):
+    """Заполняет базу одинаковыми при одном ``random_seed`` данными.
+
+    Данные грузятся тем же импортером, что и import_content, поэтому
+    счетчики, ленты и поиск после загрузки пересчитываются разом.
+    """
+    rng = random.Random(random_seed)
+    slugs = [f'bench-{number}' for number in range(groups)]
+    Group.objects.bulk_create(
+        Group(title=f'Группа {slug}', slug=slug, description=text(rng))
+        for slug in slugs
+    )
+    names = [username(number) for number in range(users)]
+    Importer('posts', create_users=True).run(
+        post_rows(rng, names, slugs, posts_per_author)
+    )
+    Importer('comments', create_users=True).run(
+        comment_rows(rng, names, comments_per_post)
+    )
+    Importer('follows', create_users=True).run(
+        follow_rows(rng, names, follows_per_user)
+    )
+    for command in ('reconcile_counters', 'rebuild_timelines',
+                    'rebuild_search_index'):
+        call_command(command, stdout=stdout)
+    cache.clear()
+
+
+def sample_kwargs(viewer):
+    post = Post.objects.filter(author=viewer).order_by('-pub_date').first()
+    group = Group.objects.order_by('pk').first()
+    return {
+        'username': viewer.username,
+        'slug': group.slug if group else 'missing',
+        'post_id': post.pk if post else 0,
+        'kind': SAMPLE_KIND,
+        'file_format': SAMPLE_FORMAT,
+    }
+
+
+def route_paths(viewer, names=None):
+    """Адрес каждого маршрута posts с параметрами из базы."""
+    kwargs = sample_kwargs(viewer)
+    paths = {}
+    for pattern in urls.urlpatterns:
+        if names and pattern.name not in names:
+            continue
+        paths[pattern.name] = reverse(
+            f'{urls.app_name}:{pattern.name}',
+            kwargs={name: kwargs[name] for name in pattern.pattern.converters}
+        )
+    return paths
+
+
+def measure(client, path, requests=30, warmup=1, cold=False):
+    latencies = []
+    query_counts = []
+    query_times = []
+    status = None
+    for number in range(warmup + requests):
+        if cold:
+            cache.clear()
+        queries = QueryTimer()
+        with connection.execute_wrapper(queries):
+            started = time.perf_counter()
+            response = client.get(path)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        status = response.status_code
+        if number < warmup:
+            continue
+        latencies.append(elapsed * 1000)
+        query_counts.append(queries.count)
+        query_times.append(queries.seconds * 1000)
+    return {
+        'path': path,
+        'status': status,
+        'requests': requests,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(sum(latencies) / requests, 3),
+        'sql_queries': round(sum(query_counts) / requests, 2),
+        'sql_queries_max': max(query_counts),
+        'sql_ms': round(sum(query_times) / requests, 3),
+    }
+
+
+VOLUMES = {
+    'users': 100,
+    'posts_per_author': 20,
+    'follows_per_user': 10,
+    'comments_per_post': 2,
+    'groups': 10,
+}
+
+
+def add_seed_arguments(parser):
+    for name, default in VOLUMES.items():
+        parser.add_argument(
+            f'--{name.replace("_", "-")}', type=int, default=default
+        )
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--keepdb', action='store_true',
+        help='Не удалять тестовую базу и не заполнять ее повторно.'
+    )
+
+
+# Замеры чистят кэш, поэтому у них свой LocMemCache: общий memcached
+# из CACHE_LOCATION с лентами и миниатюрами сайта не трогается.
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.InstrumentedLocMemCache',
+        'LOCATION': 'bench',
+    }
+}
+
+
+@contextmanager
+def seeded_database(options, stdout=None):
+    """Отдельная тестовая база и кэш без DEBUG и debug_toolbar.
+
+    Заполняется объемами из ``options``, если она пустая.
+    """
+    setup_test_environment()
+    debug, settings.DEBUG = settings.DEBUG, False
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, keepdb=options['keepdb']
+    )
+    try:
+        with override_settings(CACHES=BENCH_CACHES):
+            if not Post.objects.exists():
+                volumes = {name: options[name] for name in VOLUMES}
+                if stdout is not None:
+                    stdout.write(f'Заполнение базы: {volumes}')
+                seed(random_seed=options['seed'], stdout=stdout, **volumes)
+            yield
+    finally:
+        connection.creation.destroy_test_db(
+            old_name, verbosity=0, keepdb=options['keepdb']
+        )
+        settings.DEBUG = debug
+        teardown_test_environment()
+
+
+def viewer_client():
+    """Клиент первого автора: он же владелец постов и сотрудник.
+
+    Поэтому закрытые адреса отвечают так же, как владельцу, а не
+    редиректом на вход.
+    """
+    viewer = User.objects.get(username=username(0))
+    if not viewer.is_staff:
+        viewer.is_staff = True
+        viewer.save(update_fields=['is_staff'])
+    client = Client()
+    client.force_login(viewer)
+    return viewer, client
+
+
+def run(requests=30, warmup=1, cold=False, names=None):
+    """Замеряет все маршруты posts от имени первого автора."""
+    viewer, client = viewer_client()
+    return {
+        name: measure(client, path, requests, warmup, cold)
+        for name, path in route_paths(viewer, names).items()
+    }
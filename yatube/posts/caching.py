@@ -0,0 +1,133 @@
+import time
+from datetime import datetime
+from functools import wraps
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.views.decorators.cache import cache_page
+
+from core import replicas
+
+VERSION_KEY = 'feed-version:{}'
+
+
+def new_version():
+    """Время изменения в наносекундах и случайный хвост.
+
+    По времени версии отдается Last-Modified: версия, созданная при
+    промахе кэша, моложе настоящего изменения, так что 304 не
+    отдается по устаревшим данным.
+    """
+    return f'{time.time_ns()}.{uuid4().hex[:8]}'
+
+
+def version_time(version):
+    try:
+        nanoseconds = int(version.split('.')[0])
+    except ValueError:
+        return None
+    return datetime.fromtimestamp(nanoseconds / 1e9, timezone.utc)
+
+
+def feed_version(feed):
+    key = VERSION_KEY.format(feed)
+    version = cache.get(key)
+    if version is None:
+        version = new_version()
+        cache.add(key, version, settings.FEED_VERSION_TIMEOUT)
+        version = cache.get(key, version)
+    return version
+
+
+def feed_versions(feeds):
+    """Версии нескольких лент одним запросом к кэшу."""
+    keys = {VERSION_KEY.format(feed): feed for feed in feeds}
+    found = cache.get_many(list(keys))
+    versions = {keys[key]: version for key, version in found.items()}
+    for feed in feeds:
+        if feed not in versions:
+            versions[feed] = feed_version(feed)
+    return versions
+
+
+def _bump(feeds):
+    cache.set_many(
+        {VERSION_KEY.format(feed): new_version() for feed in feeds},
+        settings.FEED_VERSION_TIMEOUT,
+    )
+
+
+def bump_feeds(*feeds):
+    """Сбрасывает кэш лент: старые страницы остаются под старой версией.
+
+    Версия меняется сразу и еще раз после коммита, чтобы не осталась
+    страница, закэшированная конкурентным запросом до коммита.
+    """
+    feeds = {feed for feed in feeds if feed}
+    _bump(feeds)
+    transaction.on_commit(lambda: _bump(feeds))
+
+
+def cache_feed(feed, timeout=None, per_user=False):
+    """Кэширует страницу ленты, пока не изменится ее версия.
+
+    ``feed`` - имя ленты или функция, получающая его из kwargs view.
+    ``per_user`` - своя копия страницы для каждого пользователя: Vary:
+    Cookie ставит SessionMiddleware уже после cache_page, поэтому без
+    этого страница одного зрителя достанется всем. Такая копия зависит
+    и от подписок зрителя и его рекомендаций, то есть от following_feed.
+    """
+    if timeout is None:
+        timeout = settings.FEED_CACHE_TIMEOUT
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            name = feed(**kwargs) if callable(feed) else feed
+            prefix = f'feed.{name}.{feed_version(name)}'
+            if per_user and request.user.is_authenticated:
+                viewer = following_feed(request.user.pk)
+                prefix = (
+                    f'{prefix}.{request.user.pk}.{feed_version(viewer)}'
+                )
+            elif per_user:
+                prefix = f'{prefix}.0'
+            page_timeout = timeout
+            if replicas.in_use():
+                page_timeout = min(
+                    timeout, settings.REPLICA_FEED_CACHE_TIMEOUT
+                )
+            cached_view = cache_page(page_timeout, key_prefix=prefix)(view)
+            return cached_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def group_feed(slug):
+    return f'group:{slug}'
+
+
+def profile_feed(username):
+    return f'profile:{username}'
+
+
+def post_feed(post_id):
+    return f'post:{post_id}'
+
+
+def following_feed(user_id):
+    """Меняется при подписках и отписках и пересчете рекомендаций."""
+    return f'following:{user_id}'
+
+
+def post_feeds(post, group_slug=None):
+    """Ленты, в которых показывается пост, и страница самого поста."""
+    feeds = ['index', profile_feed(post.author.username), post_feed(post.pk)]
+    if post.group_id:
+        feeds.append(group_feed(post.group.slug))
+    if group_slug:
+        feeds.append(group_feed(group_slug))
+    return feeds
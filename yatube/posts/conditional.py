@@ -0,0 +1,93 @@
+import hashlib
+from functools import wraps
+
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .caching import (
+    feed_versions, following_feed, profile_feed, version_time
+)
+from .timelines import pulled_authors
+
+
+def following_feeds(request):
+    """Лента подписок пользователя и профили популярных авторов.
+
+    Посты остальных авторов раскладываются по лентам, и раскладка сама
+    меняет версию ленты подписок каждого подписчика.
+    """
+    if not request.user.is_authenticated:
+        return []
+    usernames = pulled_authors(request.user).values_list(
+        'author__username', flat=True
+    )
+    return [following_feed(request.user.pk)] + [
+        profile_feed(username) for username in usernames
+    ]
+
+
+def profile_feeds(request, username):
+    """Профиль и, для вошедшего, его подписки с рекомендациями."""
+    feeds = [profile_feed(username)]
+    if request.user.is_authenticated:
+        feeds.append(following_feed(request.user.pk))
+    return feeds
+
+
+def get_versions(request, feeds, kwargs):
+    if not hasattr(request, '_feed_versions'):
+        request._feed_versions = feed_versions(feeds(request, **kwargs))
+    return request._feed_versions
+
+
+def make_etag(request, versions, per_user):
+    if not versions:
+        return None
+    parts = [request.get_full_path()]
+    if per_user:
+        parts.append(str(request.user.pk))
+    parts += sorted(f'{feed}={version}' for feed, version in versions.items())
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def last_change(versions):
+    times = [version_time(version) for version in versions.values()]
+    if not times or None in times:
+        return None
+    return max(times)
+
+
+def feed_condition(feeds, per_user=False):
+    """ETag и Last-Modified по версиям лент, без запросов к постам.
+
+    ``feeds(request, **kwargs)`` возвращает имена лент, от которых
+    зависит ответ. Версии меняются сигналами при любых изменениях,
+    поэтому валидаторы учитывают и правки, и удаления. ETag зависит
+    еще от адреса с курсором и, при ``per_user``, от пользователя.
+    """
+    def etag(request, *args, **kwargs):
+        return make_etag(
+            request, get_versions(request, feeds, kwargs), per_user
+        )
+
+    def last_modified(request, *args, **kwargs):
+        return last_change(get_versions(request, feeds, kwargs))
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=etag, last_modified_func=last_modified
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            # Браузер не берет страницу из своего кэша молча, а каждый
+            # раз переспрашивает: иначе max-age от cache_page прятал бы
+            # от пользователя его собственные изменения.
+            options = {'no_cache': True, 'max_age': 0}
+            if per_user:
+                options['private'] = True
+            patch_cache_control(response, **options)
+            return response
+        return wrapper
+    return decorator
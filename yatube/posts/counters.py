@@ -0,0 +1,78 @@
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def _bump(queryset, field, delta):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def bump_user(user_id, field, delta):
+    _bump(UserStats.objects.filter(user_id=user_id), field, delta)
+
+
+def bump_post(post_id, delta):
+    _bump(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def followers_count(user_id):
+    counts = UserStats.objects.filter(user_id=user_id).values_list(
+        'followers_count', flat=True
+    )
+    return next(iter(counts), 0)
+
+
+def _count(model, field):
+    subquery = (
+        model.objects.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(total=Count('pk')).values('total')
+    )
+    return Coalesce(Subquery(subquery), 0)
+
+
+def _fix(queryset, fields, batch_size):
+    """Переписывает счетчики, разошедшиеся с реальными значениями."""
+    drift = Q()
+    for field in fields:
+        drift |= ~Q(**{field: F(f'real_{field}')})
+    fixed, batch = 0, []
+    for obj in queryset.filter(drift).iterator(chunk_size=batch_size):
+        for field in fields:
+            setattr(obj, field, getattr(obj, f'real_{field}'))
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            queryset.model.objects.bulk_update(batch, fields)
+            fixed += len(batch)
+            batch = []
+    queryset.model.objects.bulk_update(batch, fields)
+    return fixed + len(batch)
+
+
+def reconcile(batch_size=1000):
+    """Пересчитывает все счетчики, возвращает число исправленных строк."""
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True
+    )
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=pk) for pk in missing.iterator()),
+        batch_size=batch_size,
+    )
+    users = UserStats.objects.annotate(
+        real_posts_count=_count(Post, 'author'),
+        real_followers_count=_count(Follow, 'author'),
+        real_following_count=_count(Follow, 'user'),
+    ).order_by()
+    posts = Post.objects.annotate(
+        real_comments_count=_count(Comment, 'post'),
+    ).order_by()
+    return (
+        _fix(
+            users,
+            ['posts_count', 'followers_count', 'following_count'],
+            batch_size,
+        ),
+        _fix(posts, ['comments_count'], batch_size),
+    )
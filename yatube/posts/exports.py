@@ -0,0 +1,121 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, StreamingHttpResponse
+
+from .models import Comment, Follow, Post
+
+BATCH_SIZE = 2000
+# Сколько байт копится перед отправкой очередного куска ответа.
+BUFFER_SIZE = 64 * 1024
+
+# Поля совпадают с форматом import_content, выгрузку можно загрузить
+# обратно. Первым всегда идет первичный ключ, по нему листаются пачки.
+COLUMNS = {
+    'posts': (
+        Post,
+        ('id', 'author', 'group', 'text', 'pub_date', 'image'),
+        ('id', 'author__username', 'group__slug', 'text', 'pub_date',
+         'image'),
+    ),
+    'comments': (
+        Comment,
+        ('id', 'post', 'author', 'text', 'created'),
+        ('id', 'post_id', 'author__username', 'text', 'created'),
+    ),
+    'follows': (
+        Follow,
+        ('id', 'user', 'author'),
+        ('id', 'user__username', 'author__username'),
+    ),
+}
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def keyset_rows(queryset, batch_size=BATCH_SIZE):
+    """Строки выборки пачками ``pk > последний`` в порядке ключа.
+
+    Каждая пачка читается через ``iterator``, поэтому в памяти не больше
+    одной пачки, а запросы не замедляются с ростом OFFSET.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        batch = queryset
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        fetched = 0
+        for row in batch[:batch_size].iterator(chunk_size=batch_size):
+            fetched += 1
+            yield row
+        if fetched < batch_size:
+            return
+        last_pk = row[0]
+
+
+class Echo:
+    """Файл для csv.writer, который возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(fields, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(
+            value.isoformat() if hasattr(value, 'isoformat')
+            else '' if value is None else value
+            for value in row
+        )
+
+
+def jsonl_lines(fields, rows):
+    for row in rows:
+        yield json.dumps(
+            dict(zip(fields, row)), cls=DjangoJSONEncoder,
+            ensure_ascii=False,
+        ) + '\n'
+
+
+def buffered(lines, size=BUFFER_SIZE):
+    """Склеивает строки в куски, первый кусок отдается без ожидания."""
+    buffer = []
+    length = 0
+    first = True
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if first or length >= size:
+            yield ''.join(buffer)
+            buffer = []
+            length = 0
+            first = False
+    if buffer:
+        yield ''.join(buffer)
+
+
+def export_response(kind, file_format, filename, **filters):
+    """Потоковая выгрузка записей ``kind`` в CSV или JSON lines."""
+    if kind not in COLUMNS or file_format not in CONTENT_TYPES:
+        raise Http404
+    model, fields, lookups = COLUMNS[kind]
+    rows = keyset_rows(
+        model.objects.filter(**filters).values_list(*lookups)
+    )
+    lines = (csv_lines if file_format == 'csv' else jsonl_lines)(
+        fields, rows
+    )
+    response = StreamingHttpResponse(
+        buffered(lines), content_type=CONTENT_TYPES[file_format]
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{filename}.{file_format}"'
+    )
+    return response
@@ -1,5 +1,6 @@
 from django.forms import ModelForm
 
+from .images import check_size
 from .models import Post, Comment
 
 
@@ -8,6 +9,13 @@ class PostForm(ModelForm):
         model = Post
         fields = ["text", "group", "image"]
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        # Новый файл форма уже открыла в Pillow и проверила.
+        if hasattr(image, 'image'):
+            check_size(image.image)
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
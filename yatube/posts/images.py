@@ -0,0 +1,109 @@
+import logging
+import os
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from . import thumbnails, variants
+
+# Форматы, которые пересохраняются, и опции сохранения для них.
+SAVE_OPTIONS = {
+    'JPEG': {'optimize': True, 'progressive': True},
+    'WEBP': {'method': 6},
+    'PNG': {'optimize': True},
+    'GIF': {'optimize': True},
+}
+LOSSY = ('JPEG', 'WEBP')
+# Режимы, которые формат сохраняет как есть; остальные переводятся в RGB.
+MODES = {
+    'JPEG': ('RGB', 'L', 'CMYK'),
+    'WEBP': ('RGB', 'RGBA'),
+}
+
+logger = logging.getLogger(__name__)
+
+
+def check_size(image):
+    """Отклоняет картинки, распаковка которых займет слишком много памяти.
+
+    ``image`` — картинка Pillow, которую форма уже открыла: размеры
+    берутся из заголовка, пиксели не декодируются.
+    """
+    width, height = image.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Слишком большая картинка: %(width)s×%(height)s пикселей.',
+            code='too_many_pixels',
+            params={'width': width, 'height': height},
+        )
+
+
+def normalize(data, max_side, quality, max_pixels):
+    """Поворачивает по EXIF, уменьшает и пересжимает картинку.
+
+    Работает только с байтами и не трогает Django. Метаданные не
+    переносятся. Формат остается прежним, чтобы не менялись имя файла
+    и ссылки на него. Анимацию и неизвестные форматы возвращает как
+    есть (None).
+    """
+    image = Image.open(BytesIO(data))
+    image_format = image.format
+    if image_format not in SAVE_OPTIONS or getattr(image, 'is_animated', 0):
+        return None
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ValueError(f'Слишком большая картинка: {width}×{height}')
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    if image_format in MODES and image.mode not in MODES[image_format]:
+        image = image.convert('RGB')
+    options = dict(SAVE_OPTIONS[image_format])
+    if image_format in LOSSY:
+        options['quality'] = quality
+    output = BytesIO()
+    image.save(output, image_format, **options)
+    return output.getvalue()
+
+
+def replace(name, data):
+    """Подменяет файл под тем же именем, по возможности атомарно."""
+    try:
+        path = default_storage.path(name)
+    except NotImplementedError:
+        default_storage.delete(name)
+        return default_storage.save(name, ContentFile(data))
+    descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(descriptor, 'wb') as output:
+        output.write(data)
+    os.chmod(temporary, 0o644)
+    os.replace(temporary, path)
+    return name
+
+
+def process(name):
+    """Нормализует сохраненную картинку и создает ее варианты.
+
+    Выполняется фоновой задачей ``posts.tasks.process_image`` в
+    процессах ``run_workers``. Если варианты не получились, создается
+    хотя бы обычная миниатюра.
+    """
+    try:
+        with default_storage.open(name) as source:
+            data = source.read()
+        normalized = normalize(
+            data, settings.IMAGE_MAX_SIDE,
+            settings.IMAGE_QUALITY, settings.IMAGE_MAX_PIXELS,
+        )
+        if normalized is not None:
+            replace(name, normalized)
+        manifest = variants.build(name)
+    except Exception:
+        logger.exception('Не удалось обработать картинку %s', name)
+        thumbnails.generate(name)
+        return
+    variants.save_manifest(name, manifest)
@@ -0,0 +1,250 @@
+import csv
+import json
+import os
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Follow, Group, Post, User
+
+KINDS = ('posts', 'comments', 'follows')
+
+
+def read_rows(path, file_format):
+    """Построчно читает JSONL или CSV, не загружая файл целиком.
+
+    Вместо строки JSONL, которая не разбирается в объект, отдает None.
+    """
+    with open(path, encoding='utf-8', newline='') as source:
+        if file_format == 'csv':
+            yield from csv.DictReader(source)
+            return
+        for line in source:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield row if isinstance(row, dict) else None
+
+
+def chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Отключает auto_now/auto_now_add, чтобы сохранить даты из файла."""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field, _, _ in saved:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def parse_date(value):
+    if not value:
+        return timezone.now()
+    date = parse_datetime(value)
+    if date is None:
+        raise ValueError(f'Неверная дата: {value}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date, timezone.utc)
+    return date
+
+
+def parse_id(value):
+    """Целый id из файла, ``None`` для пустого или неверного."""
+    try:
+        return int(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+class LookupCache:
+    """Кэш ``ключ -> id``: недостающие ключи догружаются пачкой."""
+
+    def __init__(self, queryset, field, create=None):
+        self.queryset = queryset
+        self.field = field
+        self.create = create
+        self.ids = {}
+
+    def load(self, keys):
+        missing = {key for key in keys if key and key not in self.ids}
+        if not missing:
+            return
+        self._fetch(missing)
+        missing -= self.ids.keys()
+        if missing and self.create is not None:
+            self.create(missing)
+            self._fetch(missing)
+
+    def _fetch(self, keys):
+        self.ids.update(
+            self.queryset.filter(**{f'{self.field}__in': keys})
+            .values_list(self.field, 'pk')
+        )
+
+    def get(self, key):
+        return self.ids.get(key)
+
+
+class Importer:
+    def __init__(self, kind, batch_size=1000, images_dir=None,
+                 create_users=False, progress=None):
+        self.kind = kind
+        self.batch_size = batch_size
+        self.images_dir = images_dir
+        self.progress = progress
+        # Пропущенные строки, из них invalid — с неверным JSON, id или
+        # датой.
+        self.imported = self.skipped = self.invalid = 0
+        self.users = LookupCache(
+            User.objects, 'username',
+            self._create_users if create_users else None,
+        )
+        self.groups = LookupCache(Group.objects, 'slug')
+
+    def _create_users(self, usernames):
+        users = []
+        for username in usernames:
+            user = User(username=username)
+            user.set_unusable_password()
+            users.append(user)
+        User.objects.bulk_create(users)
+
+    def run(self, rows):
+        build = getattr(self, f'build_{self.kind}')
+        model = {'posts': Post, 'comments': Comment, 'follows': Follow}[
+            self.kind
+        ]
+        started = time.monotonic()
+        date_fields = [
+            field for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now', False)
+            or getattr(field, 'auto_now_add', False)
+        ]
+        with explicit_dates(*date_fields):
+            for chunk in chunks(rows, self.batch_size):
+                rows = [row for row in chunk if row is not None]
+                self.invalid += len(chunk) - len(rows)
+                with transaction.atomic():
+                    objects = build(rows)
+                    model.objects.bulk_create(
+                        objects, ignore_conflicts=self.kind == 'follows'
+                    )
+                self.imported += len(objects)
+                self.skipped += len(chunk) - len(objects)
+                if self.progress is not None:
+                    elapsed = time.monotonic() - started
+                    self.progress(
+                        self.imported, self.skipped,
+                        self.imported / elapsed if elapsed else 0,
+                    )
+        return self.imported, self.skipped
+
+    def attach_image(self, name):
+        if not name or not self.images_dir:
+            return ''
+        path = os.path.join(self.images_dir, name)
+        if not os.path.isfile(path):
+            return ''
+        with open(path, 'rb') as image:
+            return default_storage.save(
+                f'posts/{os.path.basename(name)}', File(image)
+            )
+
+    def build_posts(self, chunk):
+        self.users.load(row.get('author') for row in chunk)
+        self.groups.load(row.get('group') for row in chunk)
+        row_ids = [parse_id(row.get('id')) for row in chunk]
+        # Посты с уже занятым id пропускаются: файл можно загрузить
+        # повторно после сбоя.
+        taken = set(
+            Post.objects.filter(
+                pk__in=[pk for pk in row_ids if pk]
+            ).values_list('pk', flat=True)
+        )
+        posts = []
+        for row, pk in zip(chunk, row_ids):
+            try:
+                if row.get('id') and pk is None:
+                    raise ValueError(f'Неверный id: {row["id"]}')
+                pub_date = parse_date(row.get('pub_date'))
+            except (TypeError, ValueError):
+                self.invalid += 1
+                continue
+            author_id = self.users.get(row.get('author'))
+            if author_id is None or not row.get('text') or pk in taken:
+                continue
+            if pk:
+                taken.add(pk)
+            posts.append(Post(
+                pk=pk,
+                author_id=author_id,
+                group_id=self.groups.get(row.get('group')),
+                text=row['text'],
+                pub_date=pub_date,
+                updated=pub_date,
+                image=self.attach_image(row.get('image')),
+            ))
+        return posts
+
+    def build_comments(self, chunk):
+        self.users.load(row.get('author') for row in chunk)
+        row_post_ids = [parse_id(row.get('post')) for row in chunk]
+        post_ids = set(
+            Post.objects.filter(
+                pk__in=[pk for pk in row_post_ids if pk]
+            ).values_list('pk', flat=True)
+        )
+        comments = []
+        for row, post_id in zip(chunk, row_post_ids):
+            try:
+                if row.get('post') and post_id is None:
+                    raise ValueError(f'Неверный id поста: {row["post"]}')
+                created = parse_date(row.get('created'))
+            except (TypeError, ValueError):
+                self.invalid += 1
+                continue
+            author_id = self.users.get(row.get('author'))
+            if author_id is None or post_id not in post_ids:
+                continue
+            if not row.get('text'):
+                continue
+            comments.append(Comment(
+                post_id=post_id,
+                author_id=author_id,
+                text=row['text'],
+                created=created,
+            ))
+        return comments
+
+    def build_follows(self, chunk):
+        self.users.load(row.get('user') for row in chunk)
+        self.users.load(row.get('author') for row in chunk)
+        follows = []
+        for row in chunk:
+            user_id = self.users.get(row.get('user'))
+            author_id = self.users.get(row.get('author'))
+            if None in (user_id, author_id) or user_id == author_id:
+                continue
+            follows.append(Follow(user_id=user_id, author_id=author_id))
+        return follows
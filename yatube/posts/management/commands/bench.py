@@ -0,0 +1,76 @@
+import json
+import subprocess
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from posts import bench
+from posts.models import Post
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет тестовую базу и замеряет время ответа, число и время '
+        'SQL-запросов для каждого адреса posts. Результат пишется в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        bench.add_seed_arguments(parser)
+        parser.add_argument('--requests', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=1)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом.'
+        )
+        parser.add_argument(
+            '--route', action='append', dest='routes',
+            help='Замерить только этот маршрут, можно повторять.'
+        )
+        parser.add_argument('--output', default='bench.json')
+
+    def handle(self, *args, **options):
+        volumes = {name: options[name] for name in bench.VOLUMES}
+        with bench.seeded_database(options, self.stdout):
+            volumes['posts'] = Post.objects.count()
+            results = bench.run(
+                options['requests'], options['warmup'], options['cold'],
+                options['routes'],
+            )
+        report = {
+            'revision': git_revision(),
+            'created': timezone.now().isoformat(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'volumes': volumes,
+            'requests': options['requests'],
+            'cold': options['cold'],
+            'routes': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+        self.stdout.write(
+            f'{"маршрут":<20}{"код":>5}{"p50":>9}{"p95":>9}{"p99":>9}'
+            f'{"SQL":>7}{"SQL мс":>9}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<20}{result["status"]:>5}{result["p50_ms"]:>9.2f}'
+                f'{result["p95_ms"]:>9.2f}{result["p99_ms"]:>9.2f}'
+                f'{result["sql_queries"]:>7.1f}{result["sql_ms"]:>9.2f}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты сохранены в {options["output"]}'
+        ))
@@ -0,0 +1,65 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import variants
+from posts.models import Post
+
+logger = logging.getLogger(__name__)
+
+
+def build(name):
+    try:
+        return variants.build(name)
+    except Exception:
+        logger.exception('Не удалось создать варианты для %s', name)
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Создает варианты картинок постов в нескольких ширинах в WebP и '
+        'JPEG и записывает манифесты. Рендер страниц их только читает.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересоздать варианты и для постов с готовым манифестом.'
+        )
+
+    def handle(self, *args, **options):
+        done = failed = last_pk = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            while True:
+                batch = list(
+                    Post.objects.filter(pk__gt=last_pk).exclude(image='')
+                    .order_by('pk').only('pk', 'image', 'image_variants')
+                    [:options['batch_size']]
+                )
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+                names = list(dict.fromkeys(
+                    post.image.name for post in batch
+                    if options['all'] or variants.manifest(post) is None
+                ))
+                # Рабочие процессы создаются форком и не должны
+                # унаследовать открытое соединение с базой.
+                connections.close_all()
+                manifests = executor.map(build, names, chunksize=16)
+                for name, manifest in zip(names, manifests):
+                    done += 1
+                    if manifest is None:
+                        failed += 1
+                        continue
+                    variants.save_manifest(name, manifest)
+                self.stdout.write(f'Обработано картинок: {done}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {done}, с ошибками: {failed}'
+        ))
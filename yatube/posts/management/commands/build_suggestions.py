@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации «кого почитать» по графу подписок: '
+        'подписки подписок и подписки похожих читателей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=None,
+            help='Сколько рекомендаций хранить; по умолчанию '
+                 'SUGGESTIONS_STORED.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=recommendations.BATCH_SIZE,
+            help='Пользователей в одной пачке и транзакции.'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        written = recommendations.build(
+            options['top'], options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендаций: {written}, '
+            f'за {time.monotonic() - started:.1f} с'
+        ))
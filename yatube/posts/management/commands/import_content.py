@@ -0,0 +1,66 @@
+import os
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import KINDS, Importer, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает посты, комментарии или подписки из JSONL/CSV. '
+        'Посты могут содержать поле id, на него ссылаются комментарии.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--kind', choices=KINDS, required=True)
+        parser.add_argument('--format', choices=('jsonl', 'csv'))
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--images', help='Каталог с картинками, указанными в постах.'
+        )
+        parser.add_argument(
+            '--create-users', action='store_true',
+            help='Создавать неизвестных авторов без пароля.'
+        )
+        parser.add_argument(
+            '--no-refresh', action='store_true',
+            help='Не пересчитывать счетчики, ленты, поисковый индекс '
+                 'и популярное.'
+        )
+
+    def progress(self, imported, skipped, rate):
+        self.stdout.write(
+            f'Загружено: {imported}, пропущено: {skipped}, '
+            f'{rate:.0f} строк/с'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'Файл {path} не найден')
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl'
+        )
+        importer = Importer(
+            options['kind'],
+            batch_size=options['batch_size'],
+            images_dir=options['images'],
+            create_users=options['create_users'],
+            progress=self.progress,
+        )
+        imported, skipped = importer.run(read_rows(path, file_format))
+        if not options['no_refresh']:
+            # bulk_create не отправляет сигналы, производные данные
+            # пересчитываются разом после загрузки.
+            call_command('reconcile_counters', stdout=self.stdout)
+            call_command('rebuild_timelines', stdout=self.stdout)
+            call_command('rebuild_search_index', stdout=self.stdout)
+            call_command('rebuild_trending', stdout=self.stdout)
+            cache.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: загружено {imported}, пропущено {skipped}, '
+            f'из них с ошибками {importer.invalid}'
+        ))
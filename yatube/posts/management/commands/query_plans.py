@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts import bench, query_plans
+
+
+class Command(BaseCommand):
+    help = (
+        'Собирает SQL-запросы каждого адреса posts на тестовой базе, '
+        'ищет в EXPLAIN QUERY PLAN полные просмотры и сортировки во '
+        'временном B-дереве и предлагает составные индексы.'
+    )
+
+    def add_arguments(self, parser):
+        bench.add_seed_arguments(parser)
+        parser.add_argument(
+            '--route', action='append', dest='routes',
+            help='Проверить только этот маршрут, можно повторять.'
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--apply', action='store_true',
+            help='Создать предложенные индексы и сравнить время до и после.'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('EXPLAIN QUERY PLAN есть только в SQLite.')
+        with bench.seeded_database(options, self.stdout):
+            suggestions = self.inspect(options['routes'])
+            if not suggestions:
+                self.stdout.write(self.style.SUCCESS('Новые индексы не нужны'))
+            for (table, fields), queries in suggestions.items():
+                self.stdout.write(f'Индекс {table} ({", ".join(fields)})')
+                if options['apply']:
+                    self.compare(table, fields, queries, options['repeat'])
+
+    def inspect(self, routes):
+        viewer, client = bench.viewer_client()
+        suggestions = {}
+        for name, path in bench.route_paths(viewer, routes).items():
+            for sql, params in query_plans.capture(client, path):
+                details = query_plans.explain(sql, params)
+                found = query_plans.problems(details)
+                if not found:
+                    continue
+                self.stdout.write(f'{name}: {sql}')
+                for detail in details:
+                    self.stdout.write(f'    {detail}')
+                suggestion = query_plans.suggest(sql, details)
+                if suggestion:
+                    table, fields = suggestion
+                    suggestions.setdefault(
+                        (table, tuple(fields)), []
+                    ).append((sql, params))
+        return suggestions
+
+    def compare(self, table, fields, queries, repeat):
+        """Время и план до и после индекса; индекс затем удаляется.
+
+        Постоянные индексы добавляются миграцией в Meta моделей.
+        """
+        before = [query_plans.timing(*query, repeat) for query in queries]
+        name = query_plans.create_index(table, fields)
+        try:
+            for query, was in zip(queries, before):
+                now = query_plans.timing(*query, repeat)
+                plan = '; '.join(query_plans.explain(*query))
+                self.stdout.write(
+                    f'    {was:.3f} мс -> {now:.3f} мс: {plan}'
+                )
+        finally:
+            query_plans.drop_index(name)
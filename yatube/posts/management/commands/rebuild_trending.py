@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново считает популярность постов и групп по всем постам и '
+        'комментариям. Нужна для старых данных, дальше ее ведут сигналы.'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            posts, groups = trending.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Оценки пересчитаны: постов {posts}, групп {groups}'
+        ))
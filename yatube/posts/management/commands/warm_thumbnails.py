@@ -0,0 +1,40 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.models import Post
+from posts.thumbnails import generate
+
+
+class Command(BaseCommand):
+    help = 'Создает недостающие миниатюры картинок постов на всех ядрах.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        done = failed = last_pk = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            while True:
+                batch = list(
+                    Post.objects.filter(pk__gt=last_pk).exclude(image='')
+                    .order_by('pk').values_list('pk', 'image')
+                    [:options['batch_size']]
+                )
+                if not batch:
+                    break
+                last_pk = batch[-1][0]
+                # Рабочие процессы создаются форком и не должны
+                # унаследовать открытое соединение с базой.
+                connections.close_all()
+                names = [name for _, name in batch]
+                for ok in executor.map(generate, names, chunksize=16):
+                    done += 1
+                    failed += not ok
+                self.stdout.write(f'Обработано картинок: {done}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {done}, с ошибками: {failed}'
+        ))
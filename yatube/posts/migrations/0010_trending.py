@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_suggestions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='trend',
+            field=models.FloatField(default=0, editable=False, help_text='log2 затухающей суммы постов и комментариев', verbose_name='Популярность'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='trend',
+            field=models.FloatField(default=0, editable=False, help_text='log2 затухающей суммы публикации и комментариев', verbose_name='Популярность'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['trend'], name='group_trend_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['trend'], name='post_trend_idx'),
+        ),
+    ]
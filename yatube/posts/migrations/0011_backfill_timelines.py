@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count
+
+BATCH_SIZE = 500
+
+
+def backfill_timelines(apps, schema_editor):
+    """Раскладывает посты по лентам подписок, созданных до 0003.
+
+    Посты популярных авторов не раскладываются: лента подтягивает их
+    при чтении.
+    """
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    limit = getattr(settings, 'TIMELINE_FANOUT_LIMIT', 1000)
+    pulled = Follow.objects.values('author').annotate(
+        total=Count('pk')
+    ).filter(total__gt=limit).values('author')
+    follows = Follow.objects.exclude(author__in=pulled).values_list(
+        'user_id', 'author_id'
+    )
+    entries = []
+    for user_id, author_id in follows.iterator():
+        posts = Post.objects.filter(author_id=author_id).values_list(
+            'pk', 'pub_date'
+        ).order_by()
+        for post_id, pub_date in posts.iterator():
+            entries.append(TimelineEntry(
+                user_id=user_id, post_id=post_id, pub_date=pub_date
+            ))
+            if len(entries) >= BATCH_SIZE:
+                TimelineEntry.objects.bulk_create(
+                    entries, ignore_conflicts=True
+                )
+                entries = []
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_trending'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
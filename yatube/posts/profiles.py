@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import BooleanField, Exists, OuterRef, Value
+from django.shortcuts import get_object_or_404
+
+from .caching import feed_version, profile_feed
+from .models import Follow, User
+
+HEADER_KEY = 'profile-header:{}:{}:{}'
+
+
+def header_queryset(viewer):
+    """Пользователи со счетчиками и признаком подписки ``viewer``."""
+    users = User.objects.select_related('stats')
+    if not viewer.is_authenticated:
+        return users.annotate(
+            is_following=Value(False, output_field=BooleanField())
+        )
+    return users.annotate(is_following=Exists(
+        Follow.objects.filter(user=viewer.pk, author=OuterRef('pk'))
+    ))
+
+
+def profile_author(request, username):
+    """Автор для шапки профиля: один запрос, кэш на пару зритель-автор.
+
+    Число постов, подписчиков и подписок берется из UserStats, подписка
+    зрителя — подзапросом EXISTS. Ключ содержит версию ленты профиля:
+    ее меняют посты автора и подписки на него или его самого.
+    """
+    key = HEADER_KEY.format(
+        username, request.user.pk or 0,
+        feed_version(profile_feed(username)),
+    )
+    author = cache.get(key)
+    if author is None:
+        author = get_object_or_404(
+            header_queryset(request.user), username=username
+        )
+        cache.set(key, author, settings.FEED_CACHE_TIMEOUT)
+    return author
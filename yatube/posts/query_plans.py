@@ -0,0 +1,123 @@
+import re
+import statistics
+import time
+
+from django.core.cache import cache
+from django.db import connection
+
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+TEMP_BTREE = 'USE TEMP B-TREE'
+TABLE = re.compile(r' FROM "(\w+)"')
+ORDER_BY = re.compile(r' ORDER BY (.+?)(?: LIMIT|$)')
+
+
+class QueryRecorder:
+    """Собирает SELECT-запросы, которые выполняет view."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith('SELECT'):
+            query = (sql, tuple(params or ()))
+            if query not in self.queries:
+                self.queries.append(query)
+        return execute(sql, params, many, context)
+
+
+def capture(client, path):
+    """SELECT-запросы одного холодного запроса к адресу."""
+    cache.clear()
+    recorder = QueryRecorder()
+    with connection.execute_wrapper(recorder):
+        response = client.get(path)
+        if response.streaming:
+            b''.join(response.streaming_content)
+    return recorder.queries
+
+
+def explain(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def problems(details):
+    """Полные просмотры таблиц и сортировки во временном B-дереве."""
+    found = []
+    for detail in details:
+        match = FULL_SCAN.match(detail)
+        if match:
+            found.append(f'полный просмотр {match.group(1)}')
+        elif detail.startswith(TEMP_BTREE):
+            found.append(detail[len('USE '):].lower())
+    return found
+
+
+def columns(sql, table, clause):
+    return re.findall(rf'"{table}"\."(\w+)" {clause}', sql)
+
+
+def covered(table, fields):
+    """Есть ли индекс, который начинается с этих колонок."""
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return any(
+        constraint['columns'][:len(fields)] == fields
+        for constraint in constraints.values()
+        if constraint['index'] or constraint['primary_key']
+    )
+
+
+def suggest(sql, details):
+    """Составной индекс: сначала колонки равенств, затем сортировки.
+
+    Возвращает ``(таблица, [колонки])`` или None, если план хороший
+    или подходящий индекс уже есть.
+    """
+    table = TABLE.search(sql)
+    if not problems(details) or table is None:
+        return None
+    table = table.group(1)
+    fields = columns(sql, table, r'(?:= %s|IN \()')
+    order = ORDER_BY.search(sql)
+    if order:
+        fields += columns(order.group(1), table, r'(?:ASC|DESC)')
+    fields = list(dict.fromkeys(fields))
+    if not fields or covered(table, fields):
+        return None
+    return table, fields
+
+
+def index_name(table, fields):
+    return f'{table}_{"_".join(fields)}_plan_idx'[:60]
+
+
+def create_index(table, fields):
+    name = index_name(table, fields)
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {quote(name)} ON {quote(table)} '
+            f'({", ".join(quote(field) for field in fields)})'
+        )
+    return name
+
+
+def drop_index(name):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DROP INDEX IF EXISTS {connection.ops.quote_name(name)}'
+        )
+
+
+def timing(sql, params, repeat=20):
+    """Медианное время выполнения запроса в миллисекундах."""
+    times = []
+    with connection.cursor() as cursor:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            cursor.execute(sql, params)
+            cursor.fetchall()
+            times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
@@ -0,0 +1,219 @@
+from collections import defaultdict, namedtuple
+from itertools import chain
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from . import timelines
+from .caching import bump_feeds, following_feed
+from .models import Follow, Suggestion
+
+# Вклад одного пути «подписка подписки» и вклад читателя с полностью
+# совпадающими подписками: похожие читатели говорят о вкусе больше.
+FRIENDS_WEIGHT = 1.0
+COFOLLOW_WEIGHT = 2.0
+# Сколько самых похожих читателей учитывать: дальние почти ничего не
+# добавляют к оценке, а их подписки — основная часть работы.
+SIMILAR_READERS = 50
+BATCH_SIZE = 500
+
+# Граф подписок в CSR: у вершины i подписки — following.indices[
+# following.indptr[i]:following.indptr[i + 1]], так же подписчики.
+# Вершины — номера в ids, отсортированном списке id пользователей.
+Graph = namedtuple('Graph', 'ids following followers')
+Adjacency = namedtuple('Adjacency', 'indptr indices')
+
+
+def adjacency(rows, columns, size):
+    order = np.lexsort((columns, rows))
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=size), out=indptr[1:])
+    return Adjacency(indptr, columns[order])
+
+
+def load_graph():
+    """Выгружает Follow одним запросом в два CSR-массива."""
+    pairs = Follow.objects.values_list('user_id', 'author_id')
+    flat = np.fromiter(
+        chain.from_iterable(pairs.iterator()), dtype=np.int64
+    ).reshape(-1, 2)
+    ids, dense = np.unique(flat, return_inverse=True)
+    users, authors = dense.reshape(-1, 2).T
+    return Graph(
+        ids,
+        adjacency(users, authors, len(ids)),
+        adjacency(authors, users, len(ids)),
+    )
+
+
+def neighbours(graph_adjacency, rows, weights):
+    """Все соседи вершин ``rows`` разом.
+
+    Возвращает для каждого ребра номер исходной вершины в ``rows``,
+    соседа и вес этой вершины.
+    """
+    starts = graph_adjacency.indptr[rows]
+    counts = graph_adjacency.indptr[rows + 1] - starts
+    owners = np.repeat(np.arange(len(rows)), counts)
+    offsets = np.arange(len(owners)) - np.repeat(
+        np.cumsum(counts) - counts, counts
+    )
+    return (
+        owners, graph_adjacency.indices[starts[owners] + offsets],
+        weights[owners],
+    )
+
+
+def total(keys, weights=None):
+    """Сумма весов по одинаковым ключам."""
+    keys, inverse = np.unique(keys, return_inverse=True)
+    return keys, np.bincount(inverse, weights=weights)
+
+
+def best(rows, columns, scores, limit):
+    """Не больше ``limit`` лучших столбцов в каждой строке и их места."""
+    order = np.lexsort((columns, -scores, rows))
+    rows, columns, scores = rows[order], columns[order], scores[order]
+    ranks = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    kept = ranks < limit
+    return rows[kept], columns[kept], scores[kept], ranks[kept]
+
+
+def similar_readers(graph, batch, owners, followed):
+    """Читатели с общими авторами и косинусная близость подписок.
+
+    Авторы, чьи посты не раскладываются по лентам, пропускаются: на
+    них подписаны почти все, и общего вкуса такая подписка не выдает.
+    """
+    size = len(graph.ids)
+    degree = np.diff(graph.following.indptr)
+    niche = np.diff(graph.followers.indptr)[followed] <= (
+        timelines.fanout_limit()
+    )
+    shared, readers, _ = neighbours(
+        graph.followers, followed[niche], np.ones(niche.sum())
+    )
+    keys, overlap = total(owners[niche][shared] * size + readers)
+    rows, readers = np.divmod(keys, size)
+    other = readers != batch[rows]
+    rows, readers, overlap = rows[other], readers[other], overlap[other]
+    similarity = overlap / np.sqrt(degree[batch[rows]] * degree[readers])
+    return best(rows, readers, similarity, SIMILAR_READERS)[:3]
+
+
+def score(graph, batch, top):
+    """Лучшие ``top`` кандидатов для вершин ``batch`` по весу.
+
+    Подписки подписок — путь длины два, похожие читатели — их подписки
+    с весом близости. Сам пользователь и его авторы отбрасываются.
+    Возвращает номера пользователей, кандидатов, оценки и места.
+    """
+    size = len(graph.ids)
+    owners, followed, _ = neighbours(
+        graph.following, batch, np.ones(len(batch))
+    )
+    paths, friends_picks, _ = neighbours(
+        graph.following, followed, np.ones(len(followed))
+    )
+    rows, readers, similarity = similar_readers(
+        graph, batch, owners, followed
+    )
+    picked, readers_picks, weights = neighbours(
+        graph.following, readers, similarity
+    )
+    keys, scores = total(
+        np.concatenate([
+            owners[paths] * size + friends_picks,
+            rows[picked] * size + readers_picks,
+        ]),
+        np.concatenate([
+            np.full(len(paths), FRIENDS_WEIGHT), COFOLLOW_WEIGHT * weights,
+        ]),
+    )
+    rows, candidates = np.divmod(keys, size)
+    fresh = ~np.isin(keys, owners * size + followed) & (
+        candidates != batch[rows]
+    )
+    rows, candidates, scores, ranks = best(
+        rows[fresh], candidates[fresh], scores[fresh], top
+    )
+    return batch[rows], candidates, scores, ranks
+
+
+def store(users, low, high):
+    """Заменяет рекомендации пользователей с id из [low, high).
+
+    Границы покрывают и тех, кого нет в графе: их старые рекомендации
+    удаляются. Возвращает id пользователей, чей список изменился.
+    """
+    existing = Suggestion.objects.order_by('user_id', 'rank')
+    if low is not None:
+        existing = existing.filter(user_id__gte=low)
+    if high is not None:
+        existing = existing.filter(user_id__lt=high)
+    before = defaultdict(list)
+    for user_id, author_id in existing.values_list('user_id', 'author_id'):
+        before[user_id].append(author_id)
+    existing.delete()
+    Suggestion.objects.bulk_create(
+        Suggestion(user_id=user_id, author_id=author_id, score=value,
+                   rank=rank)
+        for user_id, picks in users.items()
+        for rank, (author_id, value) in enumerate(picks)
+    )
+    return [
+        user_id for user_id in before.keys() | users.keys()
+        if before[user_id] != [author_id for author_id, _ in
+                               users.get(user_id, ())]
+    ]
+
+
+def build(top=None, batch_size=BATCH_SIZE):
+    """Пересчитывает рекомендации всех пользователей пачками.
+
+    Каждая пачка пишется в своей транзакции; у кого список изменился,
+    тем сбрасывается лента подписок. Возвращает число строк.
+    """
+    top = top or settings.SUGGESTIONS_STORED
+    graph = load_graph()
+    written = 0
+    starts = range(0, len(graph.ids), batch_size)
+    if not starts:
+        starts = [0]
+    for start in starts:
+        batch = np.arange(start, min(start + batch_size, len(graph.ids)))
+        users = defaultdict(list)
+        for user, author, value, _ in zip(*score(graph, batch, top)):
+            users[int(graph.ids[user])].append(
+                (int(graph.ids[author]), float(value))
+            )
+        stop = start + batch_size
+        with transaction.atomic():
+            changed = store(
+                users,
+                int(graph.ids[start]) if start else None,
+                int(graph.ids[stop]) if stop < len(graph.ids) else None,
+            )
+            bump_feeds(*(following_feed(user_id) for user_id in changed))
+        written += sum(len(picks) for picks in users.values())
+    return written
+
+
+def suggestions_for(user, exclude=None):
+    """Рекомендации для страницы: один запрос по (user, rank).
+
+    Авторы, на которых пользователь подписался после пересчета, и
+    ``exclude`` (владелец открытого профиля) не показываются.
+    """
+    if not user.is_authenticated:
+        return []
+    suggestions = Suggestion.objects.filter(user=user).annotate(
+        followed=Exists(Follow.objects.filter(
+            user=user.pk, author=OuterRef('author')
+        ))
+    ).filter(followed=False).select_related('author__stats')
+    if exclude is not None:
+        suggestions = suggestions.exclude(author=exclude)
+    return list(suggestions.order_by('rank')[:settings.SUGGESTIONS_SHOWN])
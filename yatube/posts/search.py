@@ -0,0 +1,181 @@
+import base64
+import re
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+POST_TABLE = 'posts_post_fts'
+COMMENT_TABLE = 'posts_comment_fts'
+
+# Маркеры подсветки не встречаются в тексте, их заменяем на <mark>
+# уже после экранирования.
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+SEARCH_SQL = f'''
+    SELECT post_id, MIN(rank) AS best, snippet FROM (
+        SELECT rowid AS post_id, bm25({POST_TABLE}) AS rank,
+               snippet({POST_TABLE}, 0, %s, %s, '…', 32) AS snippet
+        FROM {POST_TABLE} WHERE {POST_TABLE} MATCH %s
+        UNION ALL
+        SELECT post_id, bm25({COMMENT_TABLE}) AS rank,
+               snippet({COMMENT_TABLE}, 0, %s, %s, '…', 32) AS snippet
+        FROM {COMMENT_TABLE} WHERE {COMMENT_TABLE} MATCH %s
+    )
+    GROUP BY post_id
+    {{having}}
+    ORDER BY best, post_id
+    LIMIT %s
+'''
+
+
+def is_supported():
+    return connection.vendor == 'sqlite'
+
+
+def rebuild():
+    """Заново заполняет индекс из таблиц постов и комментариев."""
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {POST_TABLE}')
+        cursor.execute(f'DELETE FROM {COMMENT_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {POST_TABLE} (rowid, text) '
+            'SELECT id, text FROM posts_post'
+        )
+        cursor.execute(
+            f'INSERT INTO {COMMENT_TABLE} (rowid, text, post_id) '
+            'SELECT id, text, post_id FROM posts_comment'
+        )
+
+
+def _execute(sql, params):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def index_post(post):
+    _execute(f'DELETE FROM {POST_TABLE} WHERE rowid = %s', [post.pk])
+    _execute(
+        f'INSERT INTO {POST_TABLE} (rowid, text) VALUES (%s, %s)',
+        [post.pk, post.text],
+    )
+
+
+def unindex_post(post_id):
+    _execute(f'DELETE FROM {POST_TABLE} WHERE rowid = %s', [post_id])
+
+
+def index_comment(comment):
+    _execute(f'DELETE FROM {COMMENT_TABLE} WHERE rowid = %s', [comment.pk])
+    _execute(
+        f'INSERT INTO {COMMENT_TABLE} (rowid, text, post_id) '
+        'VALUES (%s, %s, %s)',
+        [comment.pk, comment.text, comment.post_id],
+    )
+
+
+def unindex_comment(comment_id):
+    _execute(f'DELETE FROM {COMMENT_TABLE} WHERE rowid = %s', [comment_id])
+
+
+def match_expression(query):
+    """Превращает запрос пользователя в безопасное выражение FTS5.
+
+    Все слова должны встретиться в тексте, последнее ищется по префиксу.
+    """
+    words = re.findall(r'\w+', query.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+def encode_cursor(rank, post_id):
+    raw = f'{rank!r}|{post_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        rank, post_id = raw.decode().split('|')
+        return float(rank), int(post_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class SearchResult:
+    def __init__(self, post, snippet):
+        self.post = post
+        self.snippet = snippet
+
+
+class SearchPage:
+    def __init__(self, results, next_cursor):
+        self.results = results
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+
+def search(query, after=None, per_page=10):
+    """Посты, в тексте или комментариях которых есть все слова запроса.
+
+    Результаты отсортированы по релевантности (bm25), страницы
+    переключаются курсором ``after``.
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return SearchPage([], None)
+    if not is_supported():
+        posts = Post.objects.select_related('author', 'group').filter(
+            text__icontains=query
+        )[:per_page]
+        return SearchPage(
+            [SearchResult(post, post.text[:200]) for post in posts], None
+        )
+    params = [MARK_START, MARK_END, expression] * 2
+    having = ''
+    cursor_value = decode_cursor(after)
+    if cursor_value is not None:
+        having = 'HAVING best > %s OR (best = %s AND post_id > %s)'
+        rank, post_id = cursor_value
+        params += [rank, rank, post_id]
+    params.append(per_page + 1)
+    with connection.cursor() as cursor:
+        cursor.execute(SEARCH_SQL.format(having=having), params)
+        rows = cursor.fetchall()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        [post_id for post_id, _, _ in rows]
+    )
+    results = [
+        SearchResult(posts[post_id], highlight(snippet))
+        for post_id, _, snippet in rows if post_id in posts
+    ]
+    return SearchPage(results, next_cursor)
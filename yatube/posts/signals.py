@@ -0,0 +1,150 @@
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import counters, search, tasks, thumbnails, timelines, trending
+from .caching import (
+    bump_feeds, following_feed, group_feed, post_feed, post_feeds,
+    profile_feed
+)
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def follower_feeds(author_id):
+    """Ленты подписок, в которые разложены посты автора.
+
+    Посты популярного автора в них не лежат: такие ленты зависят от
+    версии его профиля.
+    """
+    return [
+        following_feed(user_id)
+        for user_id in timelines.pushed_followers(author_id)
+    ]
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_feeds(group_feed(instance.slug))
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_posts(sender, instance, **kwargs):
+    # Посты отвязываются от группы одним UPDATE без сигналов Post.
+    instance._posts = list(Post.objects.filter(group=instance).values_list(
+        'pk', 'author__username'
+    ))
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    posts = getattr(instance, '_posts', [])
+    bump_feeds(
+        'index', group_feed(instance.slug),
+        *(profile_feed(username) for _, username in posts),
+        *(post_feed(pk) for pk, _ in posts),
+    )
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        previous = Post.objects.filter(pk=instance.pk).values_list(
+            'group__slug', 'image'
+        ).first()
+        if previous is not None:
+            instance._old_group_slug, instance._old_image = previous
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.bump_user(instance.author_id, 'posts_count', 1)
+        trending.record_post(instance)
+        followers = counters.followers_count(instance.author_id)
+        if 0 < followers <= timelines.inline_fanout_limit():
+            tasks.fan_out_post(instance.pk)
+        elif followers <= timelines.fanout_limit():
+            tasks.fan_out_post.delay(instance.pk)
+    if (
+        instance.image.name != getattr(instance, '_old_image', '')
+        and thumbnails.stored_name(instance)
+    ):
+        tasks.process_image.delay(instance.image.name)
+    search.index_post(instance)
+    feeds = post_feeds(instance, getattr(instance, '_old_group_slug', None))
+    if not created:
+        # Новый пост сбрасывает ленты подписчиков после раскладки.
+        feeds += follower_feeds(instance.author_id)
+    bump_feeds(*feeds)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, 'posts_count', -1)
+    search.unindex_post(instance.pk)
+    bump_feeds(
+        *post_feeds(instance), *follower_feeds(instance.author_id)
+    )
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_post(instance.post_id, 1)
+        trending.record_comment(instance, instance.post.group_id)
+        search.index_comment(instance)
+        bump_feeds(
+            *post_feeds(instance.post),
+            *follower_feeds(instance.post.author_id),
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_post(instance.post_id, -1)
+    search.unindex_comment(instance.pk)
+    bump_feeds(
+        *post_feeds(instance.post), *follower_feeds(instance.post.author_id)
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_user(instance.user_id, 'following_count', 1)
+        counters.bump_user(instance.author_id, 'followers_count', 1)
+        if not timelines.is_pulled(instance.author_id):
+            # Подписавшийся сразу видит посты автора в своей ленте.
+            timelines.backfill(instance.user_id, instance.author_id)
+        bump_feeds(
+            profile_feed(instance.author.username),
+            profile_feed(instance.user.username),
+            following_feed(instance.user_id),
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.user_id, 'following_count', -1)
+    counters.bump_user(instance.author_id, 'followers_count', -1)
+    timelines.trim(instance.user_id, instance.author_id)
+    followers = counters.followers_count(instance.author_id)
+    if followers == timelines.fanout_limit():
+        # Автор перестал быть популярным: его посты, которые раньше
+        # подтягивались при чтении, раскладываются по лентам в фоне.
+        tasks.backfill_followers.delay(instance.author_id)
+    bump_feeds(
+        profile_feed(instance.author.username),
+        profile_feed(instance.user.username),
+        following_feed(instance.user_id),
+    )
@@ -0,0 +1,47 @@
+from django.core.management import call_command
+
+from core.tasks import task
+
+from . import images, timelines
+from .caching import bump_feeds, following_feed
+from .models import Post
+
+
+@task(priority=10)
+def fan_out_post(post_id):
+    """Раскладывает пост по лентам и сбрасывает ETag ленты подписок.
+
+    Версия ленты подписок меняется у каждого подписчика после
+    раскладки: иначе он получил бы закэшированную ленту без поста.
+    """
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        return
+    bump_feeds(*(
+        following_feed(user_id)
+        for user_id in timelines.fan_out_post(post)
+    ))
+
+
+@task(priority=10)
+def backfill_followers(author_id):
+    """Посты автора, переставшего быть популярным, в ленты подписчиков."""
+    bump_feeds(*(
+        following_feed(user_id)
+        for user_id in timelines.backfill_followers(author_id)
+    ))
+
+
+@task(max_attempts=2)
+def process_image(name):
+    images.process(name)
+
+
+@task(priority=-10)
+def reconcile_counters():
+    call_command('reconcile_counters')
+
+
+@task(priority=-10)
+def build_suggestions():
+    call_command('build_suggestions')
@@ -0,0 +1,11 @@
+from django import template
+
+from posts.utils import elided_page_range
+
+register = template.Library()
+
+
+@register.filter
+def page_window(page_obj):
+    """Номера страниц вокруг текущей для paginator.html."""
+    return elided_page_range(page_obj.paginator, page_obj.number)
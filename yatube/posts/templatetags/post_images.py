@@ -0,0 +1,44 @@
+import logging
+
+from django import template
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.conf import settings as sorl_settings
+
+from posts import variants
+from posts.thumbnails import GEOMETRY, OPTIONS
+
+logger = logging.getLogger(__name__)
+
+register = template.Library()
+
+# Картинка занимает всю колонку, но не шире 960px.
+SIZES = '(min-width: 992px) 960px, 100vw'
+
+
+@register.simple_tag
+def post_thumbnail(post):
+    """Миниатюра из thumbnails.prime, иначе обычный запрос к sorl."""
+    if not post.image:
+        return None
+    thumbnail = getattr(post, 'thumbnail', None)
+    if thumbnail is not None:
+        return thumbnail
+    try:
+        return get_thumbnail(post.image, GEOMETRY, **OPTIONS)
+    except Exception:
+        if sorl_settings.THUMBNAIL_DEBUG:
+            raise
+        logger.exception('Не удалось получить миниатюру для %s', post.image)
+        return None
+
+
+@register.inclusion_tag('includes/post_image.html')
+def post_image(post):
+    """``<picture>`` с готовыми вариантами из манифеста поста.
+
+    Пока вариантов нет, выводит прежнюю миниатюру.
+    """
+    picture = variants.picture(post)
+    if picture is None:
+        return {'thumbnail': post_thumbnail(post)}
+    return {'picture': picture, 'sizes': SIZES}
@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Neo')
+        cls.reader = User.objects.create_user(username='Switch')
+        cls.group = Group.objects.create(
+            title='Зион', slug='zion', description='Город'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}', group=cls.group
+            )
+            for number in range(13)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_cursor_chain(self):
+        """Лента отдается страницами по курсору after."""
+        url = reverse('posts:api_group_list', args=['zion'])
+        first = self.client.get(url).json()
+        self.assertEqual(len(first['results']), 10)
+        self.assertIsNone(first['previous'])
+        self.assertEqual(first['results'][0], {
+            'id': self.posts[-1].pk,
+            'text': 'Пост 12',
+            'author': 'Neo',
+            'group': 'zion',
+            'pub_date': self.posts[-1].pub_date.isoformat(),
+            'image': None,
+            'comments_count': 0,
+        })
+        second = self.client.get(url, {'after': first['next']}).json()
+        self.assertEqual(
+            [post['id'] for post in first['results'] + second['results']],
+            [post.pk for post in reversed(self.posts)]
+        )
+        self.assertIsNone(second['next'])
+
+    def test_conditional_get(self):
+        """Неизменившаяся лента отдает 304, новая запись меняет ETag."""
+        url = reverse('posts:api_profile', args=['Neo'])
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b'')
+        cached = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(cached.status_code, 304)
+        self.posts[0].text = 'Исправленный пост'
+        self.posts[0].save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    @override_settings(NUMBER_OF_COMMENTS=2)
+    def test_post_detail_with_comments(self):
+        """Пост отдается с комментариями, новый комментарий меняет ETag."""
+        post = self.posts[0]
+        url = reverse('posts:api_post_detail', args=[post.pk])
+        etag = self.client.get(url)['ETag']
+        for number in range(3):
+            Comment.objects.create(
+                post=post, author=self.reader, text=f'Комментарий {number}'
+            )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['comments_count'], 3)
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']],
+            ['Комментарий 0', 'Комментарий 1']
+        )
+        rest = self.client.get(url, {'after': data['next']}).json()
+        self.assertEqual(rest['comments'][0]['author'], 'Switch')
+        self.assertEqual(rest['comments'][0]['text'], 'Комментарий 2')
+        self.assertIsNone(rest['next'])
+
+    def test_follow_feed(self):
+        """Лента подписок видна только пользователю и зависит от подписок."""
+        url = reverse('posts:api_follow_index')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.reader)
+        response = self.client.get(url)
+        self.assertEqual(response.json()['results'], [])
+        etag = response['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 10)
+        etag = response['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200
+        )
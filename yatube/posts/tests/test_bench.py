@@ -0,0 +1,51 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+
+from .. import bench, urls
+from ..models import (
+    Comment, Follow, Post, TimelineEntry, User, UserStats
+)
+
+
+class BenchTest(TestCase):
+    def test_seed_and_run(self):
+        """Заполнение базы и замер всех маршрутов posts."""
+        bench.seed(
+            users=4, posts_per_author=3, follows_per_user=2,
+            comments_per_post=1, groups=2, stdout=StringIO()
+        )
+        self.assertEqual(Post.objects.count(), 12)
+        self.assertEqual(Comment.objects.count(), 12)
+        self.assertEqual(Follow.objects.count(), 8)
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertEqual(
+            UserStats.objects.get(user__username='bench0').posts_count, 3
+        )
+        results = bench.run(requests=2)
+        self.assertEqual(
+            set(results), {pattern.name for pattern in urls.urlpatterns}
+        )
+        for name, result in results.items():
+            with self.subTest(name=name):
+                self.assertIn(result['status'], (200, 302))
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+    def test_seeded_database_has_own_cache(self):
+        """Замеры чистят свой кэш, а не кэш сайта."""
+        author = User.objects.create_user(username='bench')
+        Post.objects.create(author=author, text='Пост')
+        cache.set('site', 'page')
+        with mock.patch.multiple(
+            connection.creation,
+            create_test_db=mock.DEFAULT, destroy_test_db=mock.DEFAULT,
+        ), mock.patch.multiple(
+            bench,
+            setup_test_environment=mock.DEFAULT,
+            teardown_test_environment=mock.DEFAULT,
+        ), bench.seeded_database({'keepdb': True}):
+            cache.clear()
+        self.assertEqual(cache.get('site'), 'page')
@@ -0,0 +1,110 @@
+import csv
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..exports import keyset_rows
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Trinity')
+        cls.reader = User.objects.create_user(username='Tank')
+        cls.group = Group.objects.create(
+            title='Зион', slug='zion', description='Город'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, text=f'Пост, "номер" {number}',
+                group=cls.group if number % 2 else None,
+            )
+            for number in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def content(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_profile_posts_csv(self):
+        """Посты автора выгружаются в CSV в порядке id."""
+        response = self.client.get(reverse(
+            'posts:profile_export', args=['Trinity', 'posts', 'csv']
+        ))
+        self.assertIn('Trinity-posts.csv', response['Content-Disposition'])
+        rows = list(csv.DictReader(StringIO(self.content(response))))
+        self.assertEqual(
+            [int(row['id']) for row in rows],
+            [post.pk for post in self.posts]
+        )
+        self.assertEqual(rows[1]['text'], 'Пост, "номер" 1')
+        self.assertEqual(rows[1]['group'], 'zion')
+        self.assertEqual(rows[0]['group'], '')
+        self.assertEqual(rows[0]['author'], 'Trinity')
+
+    def test_profile_comments_jsonl(self):
+        """Комментарии пользователя выгружаются в JSON lines."""
+        response = self.client.get(reverse(
+            'posts:profile_export', args=['Tank', 'comments', 'jsonl']
+        ))
+        rows = [
+            json.loads(line)
+            for line in self.content(response).splitlines()
+        ]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['post'], self.posts[0].pk)
+        self.assertEqual(rows[0]['text'], 'Комментарий')
+
+    def test_group_posts(self):
+        """В выгрузку группы попадают только ее посты."""
+        response = self.client.get(
+            reverse('posts:group_export', args=['zion', 'jsonl'])
+        )
+        ids = [
+            json.loads(line)['id']
+            for line in self.content(response).splitlines()
+        ]
+        self.assertEqual(ids, [self.posts[1].pk, self.posts[3].pk])
+
+    def test_unknown_kind_or_format(self):
+        """Неизвестный тип или формат выгрузки дает 404."""
+        for args in (['Trinity', 'follows', 'csv'],
+                     ['Trinity', 'posts', 'xml']):
+            with self.subTest(args=args):
+                response = self.client.get(
+                    reverse('posts:profile_export', args=args)
+                )
+                self.assertEqual(response.status_code, 404)
+
+    def test_site_export_is_for_staff(self):
+        """Полная выгрузка доступна только персоналу."""
+        url = reverse('posts:site_export', args=['follows', 'jsonl'])
+        self.client.force_login(self.reader)
+        self.assertEqual(self.client.get(url).status_code, 302)
+        admin = User.objects.create_user(username='Morpheus', is_staff=True)
+        staff_client = Client()
+        staff_client.force_login(admin)
+        line = json.loads(self.content(staff_client.get(url)))
+        self.assertEqual(line['user'], 'Tank')
+        self.assertEqual(line['author'], 'Trinity')
+
+    def test_keyset_rows_batches(self):
+        """Строки читаются пачками по ключу, без OFFSET."""
+        queryset = Post.objects.values_list('pk', 'text')
+        with self.assertNumQueries(3):
+            rows = list(keyset_rows(queryset, batch_size=2))
+        self.assertEqual(
+            [pk for pk, _ in rows], [post.pk for post in self.posts]
+        )
@@ -0,0 +1,80 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..images import normalize, process
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+# Тег EXIF Orientation: 6 — повернуть на 90° по часовой стрелке.
+ORIENTATION = 0x0112
+
+
+def jpeg(size, orientation=None):
+    image = Image.new('RGB', size, (255, 0, 0))
+    exif = Image.Exif()
+    if orientation:
+        exif[ORIENTATION] = orientation
+    output = BytesIO()
+    image.save(output, 'JPEG', quality=100, exif=exif.tobytes())
+    return output.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImagesTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='Morpheus')
+
+    def test_normalize(self):
+        """Картинка поворачивается по EXIF, уменьшается и теряет EXIF."""
+        image = Image.open(BytesIO(normalize(
+            jpeg((1600, 900), orientation=6), 800, 80, 10 ** 7
+        )))
+        self.assertEqual(image.format, 'JPEG')
+        self.assertEqual(image.size, (450, 800))
+        self.assertNotIn(ORIENTATION, image.getexif())
+        with self.assertRaises(ValueError):
+            normalize(jpeg((1600, 900)), 800, 80, 10 ** 6)
+
+    @override_settings(IMAGE_MAX_SIDE=500)
+    def test_process_replaces_file(self):
+        """Сохраненная картинка подменяется уменьшенной под тем же именем."""
+        post = Post(text='Фото', author=self.author)
+        post.image.save('photo.jpg', ContentFile(jpeg((1200, 800))))
+        size = post.image.size
+        process(post.image.name)
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, 'posts/photo.jpg')
+        self.assertLess(post.image.storage.size(post.image.name), size)
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (500, 333))
+
+    @override_settings(IMAGE_MAX_PIXELS=1000)
+    def test_form_rejects_too_many_pixels(self):
+        """Форма отклоняет картинку с числом пикселей выше предела."""
+        self.client.force_login(self.author)
+        response = self.client.post(reverse('posts:post_create'), {
+            'text': 'Бомба',
+            'image': SimpleUploadedFile(
+                'bomb.jpg', jpeg((100, 100)), content_type='image/jpeg'
+            ),
+        })
+        self.assertFormError(
+            response, 'form', 'image',
+            'Слишком большая картинка: 100×100 пикселей.'
+        )
+        self.assertFalse(Post.objects.exists())
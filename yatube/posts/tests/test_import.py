@@ -0,0 +1,141 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportContentTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Niobe')
+        cls.group = Group.objects.create(
+            title='Навуходоносор', slug='ship', description='Корабль'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def write(self, name, content):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def load(self, path, *args):
+        call_command('import_content', path, *args, stdout=StringIO())
+
+    def test_import_posts_comments_follows(self):
+        """Загрузка постов, комментариев и подписок из JSONL и CSV."""
+        with open(os.path.join(self.dir, 'pic.gif'), 'wb') as image:
+            image.write(b'GIF89a')
+        rows = (
+            {'id': 100, 'author': 'Niobe', 'text': 'Первый',
+             'group': 'ship', 'pub_date': '2020-01-02T03:04:05',
+             'image': 'pic.gif'},
+            {'id': 101, 'author': 'Ghost', 'text': 'Второй'},
+            {'id': 102, 'author': 'Ghost', 'text': ''},
+        )
+        posts = self.write(
+            'posts.jsonl', '\n'.join(json.dumps(row) for row in rows)
+        )
+        self.load(posts, '--kind', 'posts', '--images', self.dir,
+                  '--create-users', '--batch-size', '2')
+        comments = self.write(
+            'comments.csv',
+            'post,author,text\n100,Ghost,Отлично\n999,Ghost,Нет поста\n'
+            '100,Nobody,Нет автора\n'
+        )
+        self.load(comments, '--kind', 'comments')
+        follows = self.write(
+            'follows.csv',
+            'user,author\nGhost,Niobe\nGhost,Niobe\nNiobe,Niobe\n'
+        )
+        self.load(follows, '--kind', 'follows')
+
+        post = Post.objects.get(pk=100)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(post.image.name, 'posts/pic.gif')
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(Post.objects.get(pk=101).author.username, 'Ghost')
+        self.assertFalse(Post.objects.filter(pk=102).exists())
+        self.assertFalse(User.objects.filter(username='Nobody').exists())
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+
+    def test_bad_rows_are_skipped(self):
+        """Строки с неверными датами и id пропускаются, загрузка идет."""
+        posts = self.write('posts.jsonl', '\n'.join([
+            json.dumps({'id': 200, 'author': 'Niobe', 'text': 'Целый',
+                        'group': 'ship'}),
+            json.dumps({'id': 201, 'author': 'Niobe', 'text': 'Дата',
+                        'pub_date': 'вчера'}),
+            json.dumps({'id': 'x', 'author': 'Niobe', 'text': 'Id'}),
+            '{"id": 203,',
+        ]))
+        out = StringIO()
+        call_command('import_content', posts, '--kind', 'posts', stdout=out)
+        self.assertIn(
+            'загружено 1, пропущено 3, из них с ошибками 3', out.getvalue()
+        )
+        comments = self.write(
+            'comments.csv',
+            'post,author,text,created\n200,Niobe,Хорошо,\n'
+            'двести,Niobe,Плохой id,\n200,Niobe,Плохая дата,завтра\n'
+        )
+        out = StringIO()
+        call_command('import_content', comments, '--kind', 'comments',
+                     stdout=out)
+        self.assertIn(
+            'загружено 1, пропущено 2, из них с ошибками 2', out.getvalue()
+        )
+        self.assertEqual(list(Post.objects.values_list('pk', flat=True)),
+                         [200])
+        self.assertGreater(Post.objects.get(pk=200).trend, 0)
+        self.group.refresh_from_db()
+        self.assertGreater(self.group.trend, 0)
+
+    def test_reimport_skips_existing_posts(self):
+        """Повторная загрузка файла пропускает посты с занятым id."""
+        rows = (
+            {'id': 300, 'author': 'Niobe', 'text': 'Первый'},
+            {'id': 300, 'author': 'Niobe', 'text': 'Повтор в файле'},
+            {'id': 301, 'author': 'Niobe', 'text': 'Второй'},
+        )
+        posts = self.write(
+            'posts.jsonl', '\n'.join(json.dumps(row) for row in rows)
+        )
+        self.load(posts, '--kind', 'posts', '--batch-size', '1')
+        out = StringIO()
+        call_command('import_content', posts, '--kind', 'posts',
+                     stdout=out)
+        self.assertIn(
+            'загружено 0, пропущено 3, из них с ошибками 0', out.getvalue()
+        )
+        self.assertEqual(
+            list(Post.objects.order_by('pk').values_list('text', flat=True)),
+            ['Первый', 'Второй']
+        )
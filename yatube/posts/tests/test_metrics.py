@@ -0,0 +1,70 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core.metrics import aggregator, percentile
+
+from ..models import Post
+
+User = get_user_model()
+
+
+class ServerTimingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Link')
+        Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        aggregator.reset()
+
+    def timing(self, response):
+        return dict(
+            entry.split(';', 1)
+            for entry in response['Server-Timing'].split(', ')
+        )
+
+    def test_server_timing_header(self):
+        """Заголовок содержит view, SQL, шаблоны и кэш."""
+        timing = self.timing(self.client.get(reverse('posts:index')))
+        self.assertEqual(timing['view'], 'desc="posts:index"')
+        self.assertRegex(timing['total'], r'^dur=\d+\.\d\d$')
+        self.assertRegex(timing['sql'], r'desc="[1-9]\d* queries"')
+        self.assertNotEqual(timing['tpl'], 'dur=0.00')
+        self.assertIn('misses=', timing['cache'])
+        cached = self.timing(self.client.get(reverse('posts:index')))
+        self.assertEqual(cached['sql'].split(';')[1], 'desc="0 queries"')
+        self.assertEqual(cached['tpl'], 'dur=0.00')
+        self.assertNotIn('hits=0 ', cached['cache'])
+
+    def test_aggregator(self):
+        """Замеры копятся по имени view."""
+        for _ in range(3):
+            self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:profile', args=['Link']))
+        snapshot = aggregator.snapshot()
+        self.assertEqual(snapshot['posts:index']['requests'], 3)
+        self.assertEqual(snapshot['posts:profile']['requests'], 1)
+        self.assertGreater(snapshot['posts:index']['cache_hits'], 0)
+        self.assertGreater(snapshot['posts:profile']['template_ms'], 0)
+
+    def test_metrics_view_is_for_staff(self):
+        """Сводка доступна только персоналу."""
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 302)
+        admin = User.objects.create_user(username='Zelda', is_staff=True)
+        self.client.force_login(admin)
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('posts:index', response.json())
+
+    def test_percentile(self):
+        """Процентиль считается по ближайшему рангу."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
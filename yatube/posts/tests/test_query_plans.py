@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import query_plans
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class QueryPlansTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Trinity')
+        cls.group = Group.objects.create(
+            title='Навуходоносор', slug='ship', description='Корабль'
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Пост {number}', group=cls.group)
+            for number in range(5)
+        )
+
+    def feed_query(self, path):
+        return next(
+            query for query in query_plans.capture(self.client, path)
+            if 'ORDER BY "posts_post"."pub_date" DESC' in query[0]
+        )
+
+    def test_problems(self):
+        """Полный просмотр и временное B-дерево считаются проблемами."""
+        self.assertEqual(query_plans.problems([
+            'SCAN posts_post',
+            'SCAN posts_post USING INDEX post_pub_date_idx',
+            'SEARCH auth_user USING INTEGER PRIMARY KEY (rowid=?)',
+            'USE TEMP B-TREE FOR ORDER BY',
+        ]), ['полный просмотр posts_post', 'temp b-tree for order by'])
+
+    def test_profile_uses_composite_index(self):
+        """Лента автора читается по индексу без сортировки."""
+        sql, params = self.feed_query(
+            reverse('posts:profile', args=['Trinity'])
+        )
+        details = query_plans.explain(sql, params)
+        self.assertIn('post_author_pub_date_idx', ' '.join(details))
+        self.assertEqual(query_plans.problems(details), [])
+        self.assertIsNone(query_plans.suggest(sql, details))
+
+    def test_suggest_without_index(self):
+        """Без составного индекса предлагается группа, дата и id."""
+        query_plans.drop_index('post_group_pub_date_idx')
+        sql, params = self.feed_query(
+            reverse('posts:group_list', args=['ship'])
+        )
+        details = query_plans.explain(sql, params)
+        self.assertIn(
+            'temp b-tree for order by', query_plans.problems(details)
+        )
+        suggestion = query_plans.suggest(sql, details)
+        self.assertEqual(
+            suggestion, ('posts_post', ['group_id', 'pub_date', 'id'])
+        )
+        name = query_plans.create_index(*suggestion)
+        details = query_plans.explain(sql, params)
+        self.assertIn(name, ' '.join(details))
+        self.assertEqual(query_plans.problems(details), [])
@@ -0,0 +1,125 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import recommendations
+from ..caching import feed_version, following_feed
+from ..models import Follow, Suggestion, User
+
+
+class RecommendationsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = {
+            name: User.objects.create_user(username=name)
+            for name in ('neo', 'morpheus', 'trinity', 'tank', 'dozer')
+        }
+        # neo -> morpheus -> trinity: подписка подписки.
+        # tank тоже читает morpheus и еще dozer: похожий читатель.
+        for user, author in (
+            ('neo', 'morpheus'), ('morpheus', 'trinity'),
+            ('tank', 'morpheus'), ('tank', 'dozer'),
+        ):
+            self.follow(user, author)
+
+    def follow(self, user, author):
+        Follow.objects.create(
+            user=self.users[user], author=self.users[author]
+        )
+
+    def suggested(self, name):
+        return list(
+            Suggestion.objects.filter(user=self.users[name])
+            .order_by('rank').values_list('author__username', flat=True)
+        )
+
+    def test_graph_in_csr(self):
+        """Тест: Граф подписок выгружается в CSR-массивы."""
+        graph = recommendations.load_graph()
+        index = {
+            user.pk: number
+            for number, user in enumerate(
+                sorted(self.users.values(), key=lambda user: user.pk)
+            )
+        }
+        tank = index[self.users['tank'].pk]
+        start, stop = graph.following.indptr[tank:tank + 2]
+        self.assertEqual(
+            sorted(graph.following.indices[start:stop]),
+            sorted([index[self.users['morpheus'].pk],
+                    index[self.users['dozer'].pk]])
+        )
+        self.assertEqual(graph.followers.indptr[-1], 4)
+
+    def test_friends_of_friends_and_similar_readers(self):
+        """Тест: Подписки подписок и похожих читателей, без своих."""
+        self.assertEqual(recommendations.build(), 3)
+        self.assertEqual(self.suggested('neo'), ['dozer', 'trinity'])
+        self.assertEqual(self.suggested('tank'), ['trinity'])
+        self.assertEqual(self.suggested('morpheus'), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_authors_do_not_make_readers_similar(self):
+        """Тест: Общая подписка на популярного автора не в счет."""
+        recommendations.build()
+        self.assertEqual(self.suggested('neo'), ['trinity'])
+
+    def test_rebuild_replaces_and_bumps_changed(self):
+        """Тест: Пересчет заменяет строки и сбрасывает изменившиеся."""
+        recommendations.build()
+        neo = following_feed(self.users['neo'].pk)
+        morpheus = following_feed(self.users['morpheus'].pk)
+        versions = feed_version(neo), feed_version(morpheus)
+        Follow.objects.filter(user=self.users['tank']).delete()
+        recommendations.build(batch_size=2)
+        self.assertEqual(self.suggested('neo'), ['trinity'])
+        self.assertEqual(self.suggested('tank'), [])
+        self.assertNotEqual(feed_version(neo), versions[0])
+        self.assertEqual(feed_version(morpheus), versions[1])
+
+    def test_command(self):
+        """Тест: Команда пересчитывает рекомендации."""
+        out = StringIO()
+        call_command('build_suggestions', '--top=1', stdout=out)
+        self.assertIn('Рекомендаций: 2', out.getvalue())
+        self.assertEqual(self.suggested('neo'), ['dozer'])
+
+    def test_pages_show_suggestions_in_one_query(self):
+        """Тест: Рекомендации на страницах, без уже прочитанных."""
+        recommendations.build()
+        neo = self.users['neo']
+        with self.assertNumQueries(1):
+            suggestions = recommendations.suggestions_for(neo)
+        self.assertEqual(
+            [suggestion.author.stats.followers_count
+             for suggestion in suggestions],
+            [1, 1]
+        )
+        self.client.force_login(neo)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [suggestion.author for suggestion in
+             response.context['suggestions']],
+            [self.users['dozer'], self.users['trinity']]
+        )
+        self.assertContains(response, 'Кого почитать')
+        response = self.client.get(
+            reverse('posts:profile', args=['dozer'])
+        )
+        self.assertEqual(
+            [suggestion.author for suggestion in
+             response.context['suggestions']],
+            [self.users['trinity']]
+        )
+        self.client.get(reverse('posts:profile_follow', args=['trinity']))
+        response = self.client.get(
+            reverse('posts:profile', args=['morpheus'])
+        )
+        self.assertEqual(
+            [suggestion.author for suggestion in
+             response.context['suggestions']],
+            [self.users['dozer']]
+        )
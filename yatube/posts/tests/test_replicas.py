@@ -0,0 +1,87 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.db_router import ReplicaRouter
+from core.management.commands.sync_replicas import copy_sqlite
+from core.middleware import PRIMARY_COOKIE, ReplicaStickinessMiddleware
+from core.replicas import replica_reads
+
+from ..models import Post
+
+router = ReplicaRouter()
+
+
+@replica_reads
+def read_view(request):
+    return HttpResponse(str(router.db_for_read(Post)))
+
+
+@replica_reads
+def write_view(request):
+    router.db_for_write(Post)
+    return HttpResponse('ok')
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def call(self, view, **cookies):
+        request = self.factory.get('/')
+        request.COOKIES.update(cookies)
+        return ReplicaStickinessMiddleware(view)(request)
+
+    def test_reads_go_to_replica_only_in_marked_views(self):
+        """С реплик читают только view с replica_reads и только posts."""
+        self.assertIsNone(router.db_for_read(Post))
+        self.assertEqual(self.call(read_view).content, b'replica')
+        replica_reads(
+            lambda: self.assertIsNone(router.db_for_read(Session))
+        )()
+        self.assertEqual(router.db_for_write(Post), 'default')
+
+    def test_write_pins_client_to_primary(self):
+        """После записи клиент какое-то время читает из основной базы."""
+        response = self.call(write_view)
+        until = response.cookies[PRIMARY_COOKIE]
+        self.assertEqual(until['max-age'], 10)
+        response = self.call(read_view, **{PRIMARY_COOKIE: until.value})
+        self.assertEqual(response.content, b'None')
+        response = self.call(read_view, **{PRIMARY_COOKIE: 'broken'})
+        self.assertEqual(response.content, b'replica')
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_no_replicas(self):
+        """Без реплик все идет в основную базу и cookie не ставится."""
+        self.assertEqual(self.call(read_view).content, b'None')
+        self.assertNotIn(PRIMARY_COOKIE, self.call(write_view).cookies)
+
+    def test_relations_between_primary_and_replica(self):
+        """Объекты из реплики можно связывать с объектами из default."""
+        post, other = Post(), Post()
+        post._state.db, other._state.db = 'default', 'replica'
+        self.assertTrue(router.allow_relation(post, other))
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
+        self.assertIsNone(router.allow_migrate('default', 'posts'))
+
+    def test_copy_sqlite(self):
+        """Копия SQLite-базы содержит данные основной."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        source = os.path.join(directory, 'db.sqlite3')
+        target = os.path.join(directory, 'db.replica.sqlite3')
+        with sqlite3.connect(source) as db:
+            db.execute('CREATE TABLE t (x)')
+            db.execute('INSERT INTO t VALUES (1)')
+        db.close()
+        copy_sqlite(source, target)
+        db = sqlite3.connect(target)
+        self.assertEqual(db.execute('SELECT x FROM t').fetchall(), [(1,)])
+        db.close()
@@ -0,0 +1,84 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Post
+from ..search import search
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Cypher')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.post = Post.objects.create(
+            text='Красная таблетка <b>или</b> синяя', author=self.user
+        )
+
+    def found(self, query):
+        return [result.post for result in search(query)]
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при создании, правке и удалении поста."""
+        self.assertEqual(self.found('таблетка'), [self.post])
+        self.post.text = 'Ложки не существует'
+        self.post.save()
+        self.assertEqual(self.found('таблетка'), [])
+        self.assertEqual(self.found('ложки'), [self.post])
+        self.post.delete()
+        self.assertEqual(self.found('ложки'), [])
+
+    def test_comment_matches_its_post(self):
+        """Пост находится по тексту комментария."""
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='Добро пожаловать'
+        )
+        self.assertEqual(self.found('пожаловать'), [self.post])
+        comment.delete()
+        self.assertEqual(self.found('пожаловать'), [])
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        """Найденные слова подсвечены, HTML из текста экранирован."""
+        result, = search('таблет')
+        self.assertIn('<mark>таблетка</mark>', result.snippet)
+        self.assertIn('&lt;b&gt;', result.snippet)
+
+    def test_strange_query_does_not_fail(self):
+        """Спецсимволы FTS в запросе не ломают поиск."""
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': '"таблетка" OR (NEAR*'}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(NUMBER_OF_POSTS=2)
+    def test_search_pages_by_cursor(self):
+        """Результаты поиска листаются курсором без повторов."""
+        for i in range(4):
+            Post.objects.create(text=f'Матрица {i}', author=self.user)
+        url = reverse('posts:search')
+        results = self.guest_client.get(url, {'q': 'матрица'}).context[
+            'results'
+        ]
+        seen = [result.post for result in results]
+        while results.next_cursor:
+            results = self.guest_client.get(
+                url, {'q': 'матрица', 'after': results.next_cursor}
+            ).context['results']
+            seen += [result.post for result in results]
+        self.assertEqual(len(seen), 4)
+        self.assertEqual(len(set(seen)), 4)
+
+    def test_rebuild_command(self):
+        """Команда перестраивает индекс по данным из базы."""
+        Post.objects.filter(pk=self.post.pk).update(text='Зион')
+        self.assertEqual(self.found('зион'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.found('зион'), [self.post])
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import checks, cron, tasks
+from core.models import Task
+
+calls = []
+
+
+@tasks.task()
+def record(value):
+    calls.append(value)
+
+
+@tasks.task(max_attempts=2)
+def broken():
+    raise RuntimeError('сломано')
+
+
+RECORD = f'{__name__}.record'
+
+
+class CronTest(TestCase):
+    def test_next_run(self):
+        """Ближайшее время запуска по cron-выражению."""
+        moment = datetime(2026, 10, 18, 10, 7)
+        self.assertEqual(
+            cron.next_run('*/15 * * * *', moment),
+            datetime(2026, 10, 18, 10, 15)
+        )
+        self.assertEqual(
+            cron.next_run('30 3 * * 1', moment),
+            datetime(2026, 10, 19, 3, 30)
+        )
+        self.assertEqual(
+            cron.next_run('0 0 1 1-3 *', moment), datetime(2027, 1, 1)
+        )
+        for expression in ('* * *', '61 * * * *', '0 0 31 2 *'):
+            with self.assertRaises(ValueError):
+                cron.next_run(expression, moment)
+
+
+class TasksCacheCheckTest(TestCase):
+    def test_workers_need_shared_cache(self):
+        """Исполнители с LocMemCache дают предупреждение проверки."""
+        self.assertEqual(checks.tasks_cache_check(None), [])
+        with override_settings(TASKS_EAGER=False):
+            self.assertEqual(
+                [warning.id for warning in checks.tasks_cache_check(None)],
+                ['core.W001']
+            )
+
+
+@override_settings(TASKS_EAGER=False, TASK_RETRY_DELAY=10)
+class QueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_priority_order(self):
+        """Задачи берутся по приоритету, затем по времени постановки."""
+        record.delay('первая')
+        tasks.enqueue(RECORD, ['срочная'], priority=5)
+        tasks.enqueue(RECORD, ['отложенная'], priority=9, delay=60)
+        while True:
+            job = tasks.claim('test')
+            if job is None:
+                break
+            self.assertTrue(tasks.execute(job))
+        self.assertEqual(calls, ['срочная', 'первая'])
+        self.assertEqual(Task.objects.filter(status=Task.DONE).count(), 2)
+
+    def test_retry_then_fail(self):
+        """Упавшая задача повторяется с паузой, потом помечается ошибкой."""
+        job = broken.delay()
+        started = timezone.now()
+        self.assertFalse(tasks.execute(tasks.claim('test')))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Task.QUEUED, 1))
+        self.assertIn('RuntimeError: сломано', job.last_error)
+        self.assertGreaterEqual(job.run_at, started + timedelta(seconds=10))
+        self.assertIsNone(tasks.claim('test'))
+        Task.objects.filter(pk=job.pk).update(run_at=started)
+        self.assertFalse(tasks.execute(tasks.claim('test')))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Task.FAILED, 2))
+
+    def test_release_stale(self):
+        """Задачи упавшего исполнителя возвращаются в очередь."""
+        job = record.delay('потерянная')
+        tasks.claim('test')
+        Task.objects.filter(pk=job.pk).update(
+            locked_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(tasks.release_stale(), 1)
+        self.assertEqual(tasks.claim('test').pk, job.pk)
+
+    @override_settings(TASK_SCHEDULE={
+        'every-minute': {'task': RECORD, 'cron': '* * * * *', 'args': [1]},
+    })
+    def test_schedule_enqueues_once(self):
+        """Периодическая задача ставится один раз за срабатывание."""
+        now = timezone.now()
+        self.assertEqual(tasks.run_schedule(now), [])
+        later = now + timedelta(minutes=2)
+        self.assertEqual(tasks.run_schedule(later), ['every-minute'])
+        self.assertEqual(tasks.run_schedule(later), [])
+        job = Task.objects.get()
+        self.assertEqual((job.name, job.arguments), (
+            RECORD, '{"args": [1], "kwargs": {}}'
+        ))
@@ -0,0 +1,67 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.models import KVStore
+
+from ..models import Post, User
+from ..thumbnails import GEOMETRY, OPTIONS, generate, prime, stored_name
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        image = BytesIO()
+        Image.new('RGB', (1200, 800), (255, 0, 0)).save(image, 'JPEG')
+        self.post = Post(
+            text='Пост с картинкой',
+            author=User.objects.create_user(username='Oracle')
+        )
+        self.post.image.save(
+            'photo.jpg', ContentFile(image.getvalue()), save=True
+        )
+
+    def test_generate_stores_thumbnail(self):
+        """Миниатюра создается заранее и дальше берется из хранилища."""
+        self.assertTrue(generate(self.post.image.name))
+        entries = KVStore.objects.count()
+        thumbnail = get_thumbnail(self.post.image.name, GEOMETRY, **OPTIONS)
+        self.assertEqual(KVStore.objects.count(), entries)
+        self.assertEqual((thumbnail.width, thumbnail.height), (960, 339))
+
+    def test_stored_name_skips_missing_file(self):
+        """Для отсутствующей картинки обработка не ставится."""
+        post = Post.objects.create(
+            text='Без файла', author=self.post.author, image='/tmp/none.jpg'
+        )
+        self.assertIsNone(stored_name(post))
+        self.assertEqual(stored_name(self.post), self.post.image.name)
+
+    def test_prime_reads_page_in_one_query(self):
+        """Миниатюры страницы читаются одним запросом."""
+        generate(self.post.image.name)
+        expected = get_thumbnail(self.post.image.name, GEOMETRY, **OPTIONS)
+        posts = [
+            Post.objects.get(pk=self.post.pk),
+            Post.objects.create(text='Без картинки', author=self.post.author),
+            Post.objects.get(pk=self.post.pk),
+        ]
+        cache.clear()
+        with self.assertNumQueries(1):
+            prime(posts)
+        self.assertEqual(posts[0].thumbnail.url, expected.url)
+        self.assertEqual(posts[2].thumbnail.url, expected.url)
+        self.assertFalse(hasattr(posts[1], 'thumbnail'))
@@ -0,0 +1,108 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import query_plans, trending
+from ..models import Comment, Group, Post, User
+
+
+class TrendingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Mouse')
+        self.client.force_login(self.user)
+        self.quiet, self.busy = (
+            Group.objects.create(title=title, slug=title, description='')
+            for title in ('quiet', 'busy')
+        )
+
+    def create_post(self, group=None):
+        self.client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост', 'group': group.pk if group else ''},
+        )
+        return Post.objects.latest('pk')
+
+    def comment(self, post, times=1):
+        for _ in range(times):
+            self.client.post(
+                reverse('posts:add_comment', args=[post.pk]),
+                {'text': 'Комментарий'},
+            )
+
+    def test_scores_follow_posts_and_comments(self):
+        """Тест: Пост и комментарии сразу меняют оценки поста и группы."""
+        quiet = self.create_post(self.quiet)
+        busy = self.create_post(self.busy)
+        self.comment(busy, 3)
+        self.assertEqual(
+            list(trending.top_posts()), [busy, quiet]
+        )
+        self.assertEqual(
+            list(trending.top_groups()), [self.busy, self.quiet]
+        )
+        self.busy.refresh_from_db()
+        self.assertAlmostEqual(
+            trending.current(self.busy.trend),
+            trending.POST_WEIGHT + 3 * trending.COMMENT_WEIGHT,
+            places=2
+        )
+
+    def test_old_activity_decays(self):
+        """Тест: Старые комментарии весят меньше свежего поста."""
+        old = self.create_post(self.quiet)
+        self.comment(old, 5)
+        Post.objects.filter(pk=old.pk).update(
+            pub_date=F('pub_date') - timedelta(days=3)
+        )
+        Comment.objects.update(created=F('created') - timedelta(days=3))
+        self.create_post(self.busy)
+        out = StringIO()
+        call_command('rebuild_trending', stdout=out)
+        self.assertIn('постов 2, групп 2', out.getvalue())
+        self.assertEqual(
+            list(trending.top_groups()), [self.busy, self.quiet]
+        )
+
+    def test_incremental_matches_rebuild(self):
+        """Тест: Инкрементальные оценки совпадают с пересчетом."""
+        post = self.create_post(self.busy)
+        self.comment(post, 2)
+        self.comment(self.create_post(), 1)
+        before = dict(Post.objects.values_list('pk', 'trend'))
+        trending.rebuild()
+        for pk, trend in Post.objects.values_list('pk', 'trend'):
+            self.assertAlmostEqual(trend, before[pk], places=6)
+
+    def test_add_does_not_overflow(self):
+        """Тест: Сложение не переполняется и через много лет."""
+        post = self.create_post()
+        value = trending.heat(1, timezone.now() + timedelta(days=3650))
+        trending.add(Post.objects.filter(pk=post.pk), value)
+        post.refresh_from_db()
+        self.assertAlmostEqual(
+            post.trend, trending.combine(value, trending.heat(
+                trending.POST_WEIGHT, post.pub_date
+            ))
+        )
+
+    def test_top_read_from_index(self):
+        """Тест: Топ читается по индексу, без сортировки."""
+        sql, params = trending.top_posts().query.sql_with_params()
+        details = ' '.join(query_plans.explain(sql, params))
+        self.assertIn('post_trend_idx', details)
+        self.assertNotIn('TEMP B-TREE', details)
+
+    def test_page(self):
+        """Тест: Страница популярного."""
+        post = self.create_post(self.busy)
+        response = self.client.get(reverse('posts:trending'))
+        self.assertEqual(list(response.context['posts']), [post])
+        self.assertEqual(response.context['groups'][0], self.busy)
+        self.assertContains(response, 'активность: 3,0')
@@ -0,0 +1,85 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image, features
+
+from .. import variants
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class VariantsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        image = BytesIO()
+        Image.new('RGB', (1000, 700), (0, 0, 255)).save(image, 'PNG')
+        self.post = Post(
+            text='Пост с картинкой',
+            author=User.objects.create_user(username='Tank')
+        )
+        self.post.image.save(
+            'photo.png', ContentFile(image.getvalue()), save=True
+        )
+
+    def test_build_and_render(self):
+        """Варианты создаются заранее, страница поста только ссылается."""
+        variants.save_manifest(
+            self.post.image.name, variants.build(self.post.image.name)
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(
+            variants.manifest(self.post)['widths'], [320, 640, 960]
+        )
+        with Image.open(
+            self.post.image.storage.path(
+                variants.variant_name(self.post.image.name, 640, 'jpg')
+            )
+        ) as image:
+            self.assertEqual((image.format, image.size), ('JPEG', (640, 226)))
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        self.assertContains(
+            response, '/media/variants/posts/photo_320.jpg 320w'
+        )
+        self.assertContains(
+            response, 'src="/media/variants/posts/photo_960.jpg"'
+        )
+        if features.check('webp'):
+            self.assertContains(
+                response, '/media/variants/posts/photo_320.webp 320w'
+            )
+        else:
+            self.assertNotContains(response, '<source type="image/webp"')
+
+    def test_stale_manifest_is_ignored(self):
+        """Манифест другой картинки или испорченный не используется."""
+        self.post.image_variants = variants.dump(
+            'posts/old.jpg', [320], ['jpg']
+        )
+        self.assertIsNone(variants.manifest(self.post))
+        self.post.image_variants = 'не JSON'
+        self.assertIsNone(variants.manifest(self.post))
+        self.assertIsNone(variants.picture(self.post))
+
+    def test_command_builds_missing(self):
+        """Команда создает варианты только для постов без манифеста."""
+        call_command('build_image_variants', workers=1, stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(
+            variants.manifest(self.post)['widths'], [320, 640, 960]
+        )
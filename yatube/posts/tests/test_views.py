@@ -1,12 +1,25 @@
+import time
+from unittest import mock
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.test import Client, RequestFactory, TestCase, override_settings
 from django.urls import reverse
 from django import forms
 from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from core.models import Task
 
+from .. import tasks
+from ..caching import (
+    bump_feeds, feed_version, group_feed, post_feed, profile_feed
+)
 from ..forms import PostForm
 
-from ..models import Group, Post, Follow
+from ..models import Comment, Group, Post, Follow, TimelineEntry
+from ..profiles import profile_author
+from ..utils import FeedPaginator, encode_cursor
 
 User = get_user_model()
 
@@ -224,10 +237,65 @@ class PostsPagesTests(TestCase):
         )
         self.assertTrue(response, 'Тестовый комметарий')
 
+    def test_post_detail_query_count(self):
+        """post_detail не делает запрос на каждого комментатора."""
+        post = Post.objects.create(text='Без картинки', author=self.user)
+        for i in range(5):
+            commenter = User.objects.create_user(username=f'commenter{i}')
+            Comment.objects.create(
+                post=post, author=commenter, text='Комментарий'
+            )
+        with self.assertNumQueries(2):
+            response = self.guest_client.get(
+                reverse('posts:post_detail', kwargs={'post_id': post.pk})
+            )
+        self.assertEqual(len(response.context['comments']), 5)
+
+    @override_settings(NUMBER_OF_COMMENTS=2)
+    def test_post_detail_paginates_comments(self):
+        """Комментарии к посту выводятся постранично."""
+        for i in range(3):
+            Comment.objects.create(
+                post=self.post, author=self.user, text=f'Комментарий {i}'
+            )
+        url = reverse('posts:post_detail', kwargs={'post_id': 1})
+        response = self.guest_client.get(url, {'comments_page': 2})
+        comments = response.context['comments']
+        self.assertEqual(comments.paginator.num_pages, 2)
+        self.assertEqual(
+            [comment.text for comment in comments], ['Комментарий 2']
+        )
+
+    def test_post_card_fragment_cache(self):
+        """Карточка поста кешируется до изменения поста."""
+        post = Post.objects.create(text='Старый текст', author=self.user)
+        render_to_string('includes/post_card.html', {'post': post})
+        post.text = 'Новый текст'
+        card = render_to_string('includes/post_card.html', {'post': post})
+        self.assertIn('Старый текст', card)
+        post.save()
+        card = render_to_string('includes/post_card.html', {'post': post})
+        self.assertIn('Новый текст', card)
+
+    def test_post_card_fragment_cache_follows_author_and_group(self):
+        """Карточка поста сбрасывается при правке автора и группы."""
+        author = User.objects.create_user(username='Ronaldo')
+        group = Group.objects.create(title='Игра', slug='game')
+        post = Post.objects.create(text='Текст', author=author, group=group)
+        render_to_string('includes/post_card.html', {'post': post})
+        author.first_name = 'Криштиану'
+        group.slug = 'play'
+        card = render_to_string('includes/post_card.html', {'post': post})
+        self.assertIn('Криштиану', card)
+        self.assertIn(reverse('posts:group_list', args=['play']), card)
+        post.group = self.group2
+        card = render_to_string('includes/post_card.html', {'post': post})
+        self.assertIn(reverse('posts:group_list', args=['work2']), card)
+
     def test_cache_index_page(self):
         """Тестируем работу кеша в index_page."""
         response1 = self.authorized_client.get(reverse('posts:index'))
-        Post.objects.create(text='текстово и точка', author=self.user)
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
 
         response2 = self.authorized_client.get(reverse('posts:index'))
         self.assertEqual(response1.content, response2.content)
@@ -236,6 +304,61 @@ class PostsPagesTests(TestCase):
         response3 = self.authorized_client.get(reverse('posts:index'))
         self.assertNotEqual(response3.content, response1.content)
 
+    def test_feed_cache_is_per_user(self):
+        """Закешированная лента одного зрителя не достается другому."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:trending'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.authorized_client.get(url)
+                self.assertNotContains(
+                    self.guest_client.get(url), 'Пользователь: CR7'
+                )
+
+    def test_feed_cache_invalidated_on_changes(self):
+        """Новый пост, правка и комментарий сбрасывают кеш лент."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        changes = (
+            lambda: Post.objects.create(
+                text='Свежий пост', author=self.user, group=self.group
+            ),
+            lambda: self.authorized_client.post(
+                reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+                data={'text': 'Правка', 'group': self.group.pk}
+            ),
+            lambda: self.authorized_client.post(
+                reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+                data={'text': 'Комментарий'}
+            ),
+        )
+        for change in changes:
+            before = [self.authorized_client.get(url) for url in urls]
+            change()
+            for url, response in zip(urls, before):
+                with self.subTest(url=url):
+                    self.assertNotEqual(
+                        self.authorized_client.get(url).content,
+                        response.content
+                    )
+
+    def test_moving_post_invalidates_old_group(self):
+        """Перенос поста в другую группу сбрасывает кеш старой группы."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        self.authorized_client.get(url)
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': self.post.text, 'group': self.group2.pk}
+        )
+        response = self.authorized_client.get(url)
+        self.assertEqual(len(response.context['page_obj']), 0)
+
 
 class FollowViewsTest(TestCase):
     @classmethod
@@ -277,3 +400,361 @@ class FollowViewsTest(TestCase):
         """Тест: Неподписанный юзер не видит контент."""
         response = self.authorized_client.get(reverse('posts:follow_index'))
         self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_new_post_fans_out_to_followers(self):
+        """Тест: Новый пост сразу попадает в ленты подписчиков."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], post)
+
+    @override_settings(TASKS_EAGER=False, TIMELINE_INLINE_FANOUT_LIMIT=0)
+    def test_large_fan_out_is_queued(self):
+        """Тест: Пост автора со многими подписчиками раскладывается в фоне."""
+        Follow.objects.create(user=self.user, author=self.author)
+        Task.objects.all().delete()
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+        self.assertEqual(
+            list(Task.objects.values_list('name', flat=True)),
+            ['posts.tasks.fan_out_post']
+        )
+        tasks.fan_out_post(post.pk)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+
+    def test_unfollow_trims_timeline(self):
+        """Тест: После отписки посты автора уходят из ленты."""
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(TimelineEntry.objects.count(), 1)
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=[self.author])
+        )
+        self.assertEqual(TimelineEntry.objects.count(), 0)
+
+    @override_settings(TASKS_EAGER=False, TIMELINE_FANOUT_LIMIT=1)
+    def test_backfill_without_popular_authors(self):
+        """Тест: Лента заполняется сразу и без постов популярных."""
+        Task.objects.all().delete()
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user).count(), 1
+        )
+        other = User.objects.create_user(username='Cypher')
+        follow = Follow.objects.create(user=other, author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(user=other).exists())
+        self.assertFalse(Task.objects.exists())
+        follow.delete()
+        self.assertEqual(
+            list(Task.objects.values_list('name', flat=True)),
+            ['posts.tasks.backfill_followers']
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_popular_author_posts_are_pulled(self):
+        """Тест: Посты популярного автора читаются без раскладки."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=post).exists()
+        )
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']), [post, self.post]
+        )
+
+    def test_profile_following_is_per_viewer(self):
+        """Тест: Кнопка подписки зависит от зрителя, а не от всех подписок."""
+        cache.clear()
+        Follow.objects.create(user=self.user, author=self.author)
+        other = Client()
+        other.force_login(User.objects.create_user(username='Cypher'))
+        url = reverse('posts:profile', args=[self.author])
+        self.assertTrue(self.authorized_client.get(url).context['following'])
+        self.assertFalse(other.get(url).context['following'])
+        self.assertFalse(self.client.get(url).context['following'])
+        response = self.authorized_client.get(
+            reverse('posts:profile', args=[self.user])
+        )
+        self.assertContains(response, 'подписок: 1')
+
+    def test_profile_header_in_one_cached_query(self):
+        """Тест: Шапка профиля - один запрос, повторно берется из кэша."""
+        cache.clear()
+        request = RequestFactory().get('/')
+        request.user = self.user
+        with self.assertNumQueries(1):
+            author = profile_author(request, self.author.username)
+        self.assertEqual(author.stats.posts_count, 1)
+        self.assertFalse(author.is_following)
+        with self.assertNumQueries(0):
+            profile_author(request, self.author.username)
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=[self.author])
+        )
+        author = profile_author(request, self.author.username)
+        self.assertTrue(author.is_following)
+        self.assertEqual(author.stats.followers_count, 1)
+
+
+class KeysetPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Trinity')
+        cls.posts = [
+            Post.objects.create(text=f'Пост {i}', author=cls.user)
+            for i in range(25)
+        ]
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_pages_follow_cursor_chain(self):
+        """Страницы по курсору идут подряд, без пропусков и повторов."""
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        seen = []
+        page_obj = self.guest_client.get(url).context['page_obj']
+        seen += page_obj.object_list
+        while page_obj.has_next():
+            page_obj = self.guest_client.get(
+                url, {'after': page_obj.next_cursor}
+            ).context['page_obj']
+            seen += page_obj.object_list
+        self.assertEqual(seen, self.posts[::-1])
+
+    def test_before_cursor_returns_previous_page(self):
+        """Курсор before возвращает предыдущую страницу."""
+        url = reverse('posts:index')
+        first = self.guest_client.get(url).context['page_obj']
+        second = self.guest_client.get(
+            url, {'after': first.next_cursor}
+        ).context['page_obj']
+        back = self.guest_client.get(
+            url, {'before': second.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(back.object_list, first.object_list)
+        self.assertTrue(back.has_next())
+        self.assertFalse(back.has_previous())
+
+    def test_before_newest_post_shows_first_page(self):
+        """Курсор before новее всех постов открывает первую страницу."""
+        newest = encode_cursor(self.posts[-1])
+        page_obj = self.guest_client.get(
+            reverse('posts:index'), {'before': newest}
+        ).context['page_obj']
+        self.assertEqual(page_obj.object_list[0], self.posts[-1])
+        self.assertFalse(page_obj.has_previous())
+        self.assertIsNotNone(page_obj.next_cursor)
+        response = self.guest_client.get(
+            reverse('posts:api_index'), {'before': newest}
+        )
+        self.assertEqual(
+            response.json()['results'][0]['id'], self.posts[-1].pk
+        )
+
+    def test_broken_cursor_shows_first_page(self):
+        """Битый курсор открывает первую страницу."""
+        response = self.guest_client.get(
+            reverse('posts:index'), {'after': 'мусор'}
+        )
+        self.assertEqual(
+            response.context['page_obj'].object_list[0], self.posts[-1]
+        )
+
+    def test_keyset_page_does_not_count(self):
+        """Страница по курсору не выполняет COUNT."""
+        url = reverse('posts:index')
+        first = self.guest_client.get(url).context['page_obj']
+        with self.assertNumQueries(1):
+            page_obj = first.paginator.get_page({'after': first.next_cursor})
+            self.assertEqual(len(page_obj), 10)
+
+
+class FeedPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Apoc')
+        for i in range(25):
+            Post.objects.create(text=f'Пост {i}', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.posts = Post.objects.order_by('-pub_date', '-pk')
+
+    def test_counter_mode_does_not_count(self):
+        """Число из счетчика берется без COUNT, отставание не теряет записи."""
+        paginator = FeedPaginator(
+            self.posts, 10, FeedPaginator.COUNTER, count=5
+        )
+        with self.assertNumQueries(1):
+            page = paginator.get_page(1)
+        self.assertEqual(len(page), 10)
+        self.assertTrue(page.has_next())
+        with self.assertNumQueries(1):
+            page = paginator.get_page(3)
+        self.assertEqual(len(page), 5)
+        self.assertEqual(paginator.count, 25)
+        self.assertFalse(page.has_next())
+
+    def test_cached_mode_counts_once(self):
+        """COUNT в режиме CACHED выполняется один раз за время жизни кэша."""
+        def paginator():
+            return FeedPaginator(
+                self.posts, 10, FeedPaginator.CACHED, cache_key='test'
+            )
+        with self.assertNumQueries(2):
+            self.assertEqual(paginator().get_page(1).paginator.num_pages, 3)
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator().get_page(2).paginator.num_pages, 3)
+        Post.objects.filter(pk__in=self.posts[:10].values('pk')).delete()
+        with self.assertNumQueries(3):
+            page = paginator().get_page(3)
+        self.assertEqual(page.number, 2)
+        self.assertEqual(len(page), 5)
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator().get_page(1).paginator.num_pages, 2)
+
+    def test_probe_mode_has_next_without_count(self):
+        """В режиме PROBE следующая страница видна по лишней записи."""
+        paginator = FeedPaginator(self.posts, 10, FeedPaginator.PROBE)
+        with self.assertNumQueries(1):
+            page = paginator.get_page(2)
+            self.assertTrue(page.has_next())
+            self.assertTrue(page.has_previous())
+        with self.assertNumQueries(1):
+            self.assertFalse(paginator.get_page(3).has_next())
+        html = render_to_string(
+            'posts/includes/paginator.html', {'page_obj': page}
+        )
+        self.assertIn('?page=3', html)
+        self.assertNotIn('Последняя', html)
+
+    def test_elided_page_range(self):
+        """Выводятся только крайние страницы и соседние с текущей."""
+        paginator = FeedPaginator(self.posts, 1)
+        self.assertEqual(
+            list(paginator.get_elided_page_range(12)),
+            [1, '…', 10, 11, 12, 13, 14, '…', 25]
+        )
+        self.assertEqual(
+            list(paginator.get_elided_page_range(2)),
+            [1, 2, 3, 4, '…', 25]
+        )
+        self.assertEqual(
+            list(FeedPaginator(self.posts, 5).get_elided_page_range(3)),
+            [1, 2, 3, 4, 5]
+        )
+        html = render_to_string(
+            'posts/includes/paginator.html',
+            {'page_obj': paginator.get_page(12)}
+        )
+        self.assertEqual(html.count('class="page-item'), 13)
+        self.assertIn('<span class="page-link">…</span>', html)
+
+
+class ConditionalViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Cypher')
+        cls.reader = User.objects.create_user(username='Mouse')
+        cls.group = Group.objects.create(
+            title='Группа', slug='crew', description='Экипаж'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Пост', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unchanged_pages_return_304(self):
+        """Повторный запрос с ETag без изменений получает 304."""
+        urls = (
+            reverse('posts:group_list', args=['crew']),
+            reverse('posts:profile', args=['Cypher']),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('no-cache', response['Cache-Control'])
+                self.assertIn('private', response['Cache-Control'])
+                etag = response['ETag']
+                with self.assertNumQueries(1 if 'posts/' in url else 0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_local_feed_versions_expire(self):
+        """Версия в LocMemCache процесса живет не дольше его страниц."""
+        bump_feeds('index')
+        version = feed_version('index')
+        later = time.time() + settings.FEED_CACHE_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertNotEqual(feed_version('index'), version)
+
+    def test_changes_and_viewer_change_etag(self):
+        """ETag меняется от комментария, нового поста автора и входа."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.reader, text='!')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        Post.objects.create(author=self.user, text='Еще пост')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.client.force_login(self.reader)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_follow_feed_etag(self):
+        """ETag ленты подписок: своя версия и профили популярных."""
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.client.force_login(self.reader)
+        url = reverse('posts:follow_index')
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.reader, text='!')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        with override_settings(TIMELINE_FANOUT_LIMIT=0):
+            etag = self.client.get(url)['ETag']
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            Post.objects.create(author=self.user, text='Еще пост')
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+
+    def test_group_delete_resets_feeds(self):
+        """Удаление группы сбрасывает ленты с ее постами."""
+        group = Group.objects.create(title='Зион', slug='zion')
+        post = Post.objects.create(author=self.user, text='Док', group=group)
+        feeds = (
+            'index', group_feed('zion'), profile_feed('Cypher'),
+            post_feed(post.pk),
+        )
+        versions = [feed_version(feed) for feed in feeds]
+        link = reverse('posts:group_list', args=['zion'])
+        self.assertContains(self.client.get(reverse('posts:index')), link)
+        group.delete()
+        for feed, version in zip(feeds, versions):
+            with self.subTest(feed=feed):
+                self.assertNotEqual(feed_version(feed), version)
+        self.assertNotContains(self.client.get(reverse('posts:index')), link)
+
+    def test_missing_post_is_404(self):
+        """Несуществующий пост по-прежнему дает 404."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk + 100])
+        )
+        self.assertEqual(response.status_code, 404)
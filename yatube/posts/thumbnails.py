@@ -0,0 +1,94 @@
+import logging
+from collections import defaultdict
+
+from django.core.exceptions import SuspiciousFileOperation
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.models import KVStore
+
+# Размер миниатюры картинки поста в лентах и на странице поста.
+GEOMETRY = '960x339'
+OPTIONS = {'crop': 'center', 'upscale': True}
+
+logger = logging.getLogger(__name__)
+
+
+def generate(name):
+    """Создает миниатюру картинки, если ее еще нет."""
+    try:
+        get_thumbnail(name, GEOMETRY, **OPTIONS)
+    except Exception:
+        logger.exception('Не удалось создать миниатюру для %s', name)
+        return False
+    return True
+
+
+def stored_name(post):
+    """Имя картинки поста, если файл действительно есть в хранилище."""
+    if not post.image:
+        return None
+    try:
+        if not post.image.storage.exists(post.image.name):
+            return None
+    except SuspiciousFileOperation:
+        return None
+    return post.image.name
+
+
+def thumbnail_file(name):
+    """Миниатюра картинки без обращения к хранилищу.
+
+    Повторяет подготовку опций из ThumbnailBackend.get_thumbnail, чтобы
+    ключ совпадал с тем, под которым sorl сохраняет миниатюру.
+    """
+    backend = default.backend
+    source = ImageFile(name)
+    options = dict(OPTIONS)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return ImageFile(
+        backend._get_thumbnail_filename(source, GEOMETRY, options),
+        default.storage,
+    )
+
+
+def prime(posts):
+    """Достает миниатюры всех постов страницы одним запросом к хранилищу.
+
+    Найденная миниатюра кладется в ``post.thumbnail``, ее читает тег
+    ``post_thumbnail``. Для остальных постов тег создаст миниатюру сам.
+    """
+    keys = defaultdict(list)
+    for post in posts:
+        # Посты с вариантами выводятся без миниатюры sorl.
+        if post.image and not post.image_variants:
+            keys[add_prefix(thumbnail_file(post.image.name).key)].append(post)
+    if not keys:
+        return
+    kv_cache = default.kvstore.cache
+    found = kv_cache.get_many(list(keys))
+    missing = [key for key in keys if key not in found]
+    if missing:
+        stored = dict(
+            KVStore.objects.filter(key__in=missing)
+            .values_list('key', 'value')
+        )
+        kv_cache.set_many(stored, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        found.update(stored)
+    for key, key_posts in keys.items():
+        value = found.get(key)
+        if value is None or value == EMPTY_VALUE:
+            continue
+        thumbnail = deserialize_image_file(value)
+        for post in key_posts:
+            post.thumbnail = thumbnail
@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.db.models import Q
+
+from .counters import followers_count
+from .models import Follow, Post, TimelineEntry
+
+BATCH_SIZE = 500
+
+
+def fanout_limit():
+    return getattr(settings, 'TIMELINE_FANOUT_LIMIT', 1000)
+
+
+def inline_fanout_limit():
+    return getattr(settings, 'TIMELINE_INLINE_FANOUT_LIMIT', 100)
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора.
+
+    У популярных авторов (подписчиков больше TIMELINE_FANOUT_LIMIT) пост
+    не раскладывается, такие посты лента подтягивает при чтении.
+    Возвращает id подписчиков, в чьи ленты лег пост.
+    """
+    follower_ids = pushed_followers(post.author_id)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in follower_ids
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    return follower_ids
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту пользователя все посты автора."""
+    posts = (
+        Post.objects.filter(author_id=author_id)
+        .values_list('pk', 'pub_date').order_by().iterator()
+    )
+    entries = []
+    for post_id, pub_date in posts:
+        entries.append(TimelineEntry(
+            user_id=user_id, post_id=post_id, pub_date=pub_date
+        ))
+        if len(entries) >= BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+            entries = []
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def trim(user_id, author_id):
+    """Убирает из ленты пользователя посты автора."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def is_pulled(author_id):
+    """Посты автора подтягиваются при чтении, а не лежат в лентах."""
+    return followers_count(author_id) > fanout_limit()
+
+
+def pushed_followers(author_id):
+    """Подписчики, в чьи ленты раскладываются посты автора.
+
+    У популярного автора таких нет: его посты подтягиваются при чтении.
+    """
+    if is_pulled(author_id):
+        return []
+    return list(Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True))
+
+
+def backfill_followers(author_id):
+    """Раскладывает посты автора по лентам всех его подписчиков.
+
+    Возвращает id подписчиков.
+    """
+    follower_ids = pushed_followers(author_id)
+    for follower_id in follower_ids:
+        backfill(follower_id, author_id)
+    return follower_ids
+
+
+def pulled_authors(user):
+    """Популярные авторы из подписок, их посты читаются напрямую."""
+    return Follow.objects.filter(
+        user=user, author__stats__followers_count__gt=fanout_limit()
+    ).values_list('author_id', flat=True)
+
+
+def timeline_posts(user):
+    """Посты авторов, на которых подписан пользователь, от новых к старым."""
+    pulled = list(pulled_authors(user))
+    if not pulled:
+        return Post.objects.filter(timeline_entries__user=user).order_by(
+            '-timeline_entries__pub_date', '-timeline_entries__post'
+        )
+    entries = TimelineEntry.objects.filter(user=user).values('post')
+    return Post.objects.filter(
+        Q(pk__in=entries) | Q(author_id__in=pulled)
+    ).order_by('-pub_date', '-pk')
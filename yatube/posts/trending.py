@@ -0,0 +1,111 @@
+import math
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Greatest, Least, Log, Power
+from django.utils import timezone
+
+from .models import Comment, Group, Post
+
+# Оценка хранится как log2 суммы весов событий, каждый из которых
+# умножен на 2 ** (часов от EPOCH / период полураспада). Затухание у
+# всех строк одинаковое, поэтому порядок по хранимому числу и есть
+# порядок по текущей активности: топ читается по индексу, а пересчета
+# с новым началом отсчета не нужно.
+EPOCH = datetime(2022, 1, 1, tzinfo=timezone.utc)
+POST_WEIGHT = 3.0
+COMMENT_WEIGHT = 1.0
+
+
+def heat(weight, moment=None):
+    """Вклад события в хранимую оценку."""
+    hours = ((moment or timezone.now()) - EPOCH).total_seconds() / 3600
+    return math.log2(weight) + hours / settings.TRENDING_HALF_LIFE
+
+
+def current(trend, moment=None):
+    """Хранимая оценка, затухшая к ``moment``: сумма весов событий."""
+    return 2 ** (trend - heat(1, moment))
+
+
+def add(queryset, value):
+    """trend = log2(2 ** trend + 2 ** value) одним UPDATE.
+
+    Разность берется от большего слагаемого, поэтому степени двойки
+    не переполняются, сколько бы лет ни прошло от EPOCH.
+    """
+    value = Value(value, output_field=FloatField())
+    high = Greatest(F('trend'), value)
+    low = Least(F('trend'), value)
+    two = Value(2.0, output_field=FloatField())
+    queryset.update(trend=high + Log(two, Value(1.0) + Power(two, low - high)))
+
+
+def record_post(post):
+    """Новый пост сразу получает вес публикации, его группа — тоже."""
+    value = heat(POST_WEIGHT, post.pub_date)
+    post.trend = value
+    Post.objects.filter(pk=post.pk).update(trend=value)
+    if post.group_id:
+        add(Group.objects.filter(pk=post.group_id), value)
+
+
+def record_comment(comment, group_id):
+    """Комментарий добавляет вес посту и группе поста."""
+    value = heat(COMMENT_WEIGHT, comment.created)
+    add(Post.objects.filter(pk=comment.post_id), value)
+    if group_id:
+        add(Group.objects.filter(pk=group_id), value)
+
+
+def top_posts(limit=None):
+    return Post.objects.select_related('author', 'group').order_by(
+        '-trend'
+    )[:limit or settings.TRENDING_POSTS]
+
+
+def top_groups(limit=None):
+    return Group.objects.order_by('-trend')[
+        :limit or settings.TRENDING_GROUPS
+    ]
+
+
+def combine(first, second):
+    """То же сложение, что и ``add``, для чисел в Python."""
+    high, low = max(first, second), min(first, second)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def accumulate(scores, key, value):
+    if key is not None:
+        scores[key] = combine(scores[key], value) if key in scores else value
+
+
+def rebuild():
+    """Считает оценки заново по всем постам и комментариям.
+
+    Нужен один раз для старых данных: дальше оценки ведут сигналы.
+    Возвращает число постов и групп с оценкой.
+    """
+    posts, groups, post_groups = {}, {}, {}
+    for pk, group_id, pub_date in Post.objects.values_list(
+        'pk', 'group_id', 'pub_date'
+    ).iterator():
+        value = heat(POST_WEIGHT, pub_date)
+        accumulate(posts, pk, value)
+        accumulate(groups, group_id, value)
+        post_groups[pk] = group_id
+    for post_id, created in Comment.objects.values_list(
+        'post_id', 'created'
+    ).iterator():
+        value = heat(COMMENT_WEIGHT, created)
+        accumulate(posts, post_id, value)
+        accumulate(groups, post_groups.get(post_id), value)
+    Group.objects.update(trend=0)
+    for model, scores in ((Post, posts), (Group, groups)):
+        model.objects.bulk_update(
+            [model(pk=pk, trend=value) for pk, value in scores.items()],
+            ['trend'], batch_size=500,
+        )
+    return len(posts), len(groups)
@@ -1,8 +1,303 @@
+import base64
+
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core.cache import cache
+from django.core.paginator import (
+    EmptyPage, Page, PageNotAnInteger, Paginator
+)
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+
+COUNT_CACHE_KEY = 'paginator-count:{}'
+
+# Сколько номеров страниц показывать вокруг текущей и на концах.
+ON_EACH_SIDE = 2
+ON_ENDS = 1
+ELLIPSIS = '…'
+
+
+def elided_page_range(paginator, number, on_each_side=ON_EACH_SIDE,
+                      on_ends=ON_ENDS):
+    """Номера страниц: первые, последние и соседние с текущей.
+
+    Пропуски обозначаются ``ELLIPSIS``, так что ссылок всегда не больше
+    ``2 * (on_each_side + on_ends) + 3``, сколько бы ни было страниц.
+    """
+    num_pages = paginator.num_pages
+    if num_pages <= (on_each_side + on_ends) * 2 + 1:
+        yield from paginator.page_range
+        return
+    if number > 1 + on_each_side + on_ends + 1:
+        yield from range(1, on_ends + 1)
+        yield ELLIPSIS
+        yield from range(number - on_each_side, number + 1)
+    else:
+        yield from range(1, number + 1)
+    if number < num_pages - on_each_side - on_ends - 1:
+        yield from range(number + 1, number + on_each_side + 1)
+        yield ELLIPSIS
+        yield from range(num_pages - on_ends + 1, num_pages + 1)
+    else:
+        yield from range(number + 1, num_pages + 1)
+
+
+class ProbedPage(Page):
+    """Страница, о следующей странице которой говорит лишняя запись."""
+
+    def __init__(self, object_list, number, paginator,
+                 has_next, has_previous):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+
+class FeedPaginator(Paginator):
+    """Paginator, который не считает COUNT(*) на каждый запрос.
+
+    Режимы:
+    ``EXACT`` - обычный COUNT;
+    ``COUNTER`` - число из поддерживаемого счетчика ``count``;
+    ``CACHED`` - COUNT, закэшированный на ``timeout`` под ``cache_key``;
+    ``PROBE`` - без общего числа, следующая страница определяется
+    по лишней записи (LIMIT n+1).
+
+    В режимах ``COUNTER`` и ``CACHED`` страница тоже читается с лишней
+    записью, и приблизительное число подгоняется под увиденное, так что
+    записи не теряются, даже если счетчик отстал.
+    """
+    EXACT = 'exact'
+    COUNTER = 'counter'
+    CACHED = 'cached'
+    PROBE = 'probe'
+    page_class = ProbedPage
+
+    def __init__(self, object_list, per_page, mode=EXACT, count=None,
+                 cache_key=None, timeout=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.mode = mode
+        self.counter = count
+        self.cache_key = cache_key
+        self.timeout = (
+            settings.PAGINATOR_COUNT_TIMEOUT if timeout is None else timeout
+        )
+
+    @property
+    def has_total(self):
+        return self.mode != self.PROBE
+
+    @cached_property
+    def count(self):
+        if self.mode == self.COUNTER:
+            return self.counter() if callable(self.counter) else self.counter
+        if self.mode == self.CACHED:
+            key = COUNT_CACHE_KEY.format(self.cache_key)
+            count = cache.get(key)
+            if count is None:
+                count = super().count
+                cache.set(key, count, self.timeout)
+            return count
+        return super().count
+
+    def _set_count(self, count):
+        if self.mode == self.CACHED and count != self.count:
+            cache.set(
+                COUNT_CACHE_KEY.format(self.cache_key), count, self.timeout
+            )
+        self.__dict__['count'] = count
+        self.__dict__.pop('num_pages', None)
+
+    def _settle_count(self, bottom, fetched):
+        if fetched > self.per_page:
+            self._set_count(max(self.count, bottom + fetched))
+        elif fetched or not bottom:
+            self._set_count(bottom + fetched)
+
+    def validate_number(self, number):
+        if self.mode == self.EXACT:
+            return super().validate_number(number)
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы должен быть числом')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        return number
+
+    def probe_page(self, number, object_list=None):
+        if object_list is None:
+            object_list = self.object_list
+        bottom = (number - 1) * self.per_page
+        objects = list(object_list[bottom:bottom + self.per_page + 1])
+        if self.mode == self.PROBE:
+            return self.page_class(
+                objects[:self.per_page], number, self,
+                has_next=len(objects) > self.per_page,
+                has_previous=number > 1,
+            )
+        self._settle_count(bottom, len(objects))
+        if not objects and number > 1:
+            raise EmptyPage('На этой странице нет записей')
+        return self._get_page(objects[:self.per_page], number, self)
+
+    def page(self, number):
+        if self.mode == self.EXACT:
+            return super().page(number)
+        return self.probe_page(self.validate_number(number))
 
+    def get_elided_page_range(self, number=1, on_each_side=ON_EACH_SIDE,
+                              on_ends=ON_ENDS):
+        return elided_page_range(
+            self, self.validate_number(number), on_each_side, on_ends
+        )
 
-def get_paginators_page(posts, request):
-    paginator = Paginator(posts, settings.NUMBER_OF_POSTS)
+    def get_page(self, number):
+        if self.mode in (self.EXACT, self.PROBE):
+            return super().get_page(number)
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            # Приблизительное число завышено: последняя страница берется
+            # по точному COUNT.
+            self._set_count(Paginator.count.func(self))
+            return self.page(self.num_pages)
+
+
+def get_paginators_page(posts, request, mode=FeedPaginator.EXACT,
+                        **options):
+    paginator = FeedPaginator(
+        posts, settings.NUMBER_OF_POSTS, mode, **options
+    )
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
+
+
+def get_comments_page(post, request):
+    comments = post.comments.select_related('author').order_by(
+        'created', 'pk'
+    )
+    paginator = FeedPaginator(
+        comments, settings.NUMBER_OF_COMMENTS,
+        FeedPaginator.COUNTER, count=post.comments_count,
+    )
+    return paginator.get_page(request.GET.get('comments_page'))
+
+
+def encode_cursor(obj, field='pub_date'):
+    raw = f'{getattr(obj, field).isoformat()}|{obj.pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает (дата, pk) из токена или None, если токен битый."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        pub_date, pk = raw.decode().split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk
+
+
+class KeysetPage(ProbedPage):
+    def __repr__(self):
+        return f'<Keyset page {self.previous_cursor}..{self.next_cursor}>'
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return encode_cursor(self.object_list[0])
+
+
+class KeysetPaginator(FeedPaginator):
+    """Постраничный вывод по ключу (pub_date, id) без COUNT и OFFSET.
+
+    Записи всегда идут от новых к старым, ``after`` отдает более старые
+    записи, ``before`` - более новые.
+    """
+    is_keyset = True
+    page_class = KeysetPage
+
+    def __init__(self, object_list, per_page, **kwargs):
+        super().__init__(
+            object_list, per_page, mode=FeedPaginator.PROBE, **kwargs
+        )
+
+    def page_after(self, cursor):
+        posts = self.object_list.order_by('-pub_date', '-pk')
+        if cursor is not None:
+            pub_date, pk = cursor
+            posts = posts.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            )
+        posts = list(posts[:self.per_page + 1])
+        return KeysetPage(
+            posts[:self.per_page], None, self,
+            has_next=len(posts) > self.per_page,
+            has_previous=cursor is not None,
+        )
+
+    def page_before(self, cursor):
+        """Более новые записи; если их не набралось на страницу — первая.
+
+        Так бывает, когда новые посты удалены или токен подделан.
+        """
+        pub_date, pk = cursor
+        posts = self.object_list.order_by('pub_date', 'pk').filter(
+            Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+        )
+        posts = list(posts[:self.per_page + 1])
+        if len(posts) < self.per_page:
+            return self.page_after(None)
+        return KeysetPage(
+            posts[:self.per_page][::-1], None, self,
+            has_next=True,
+            has_previous=len(posts) > self.per_page,
+        )
+
+    def page_number(self, number):
+        """Старые ссылки ``?page=N`` продолжают работать, но без COUNT."""
+        return self.probe_page(
+            number, self.object_list.order_by('-pub_date', '-pk')
+        )
+
+    def get_page(self, query):
+        before = decode_cursor(query.get('before'))
+        if before is not None:
+            return self.page_before(before)
+        after = decode_cursor(query.get('after'))
+        if after is not None:
+            return self.page_after(after)
+        try:
+            number = int(query.get('page', 1))
+        except (TypeError, ValueError):
+            number = 1
+        if number > 1:
+            return self.page_number(number)
+        return self.page_after(None)
+
+
+def get_keyset_page(posts, request):
+    paginator = KeysetPaginator(posts, settings.NUMBER_OF_POSTS)
+    return paginator.get_page(request.GET)
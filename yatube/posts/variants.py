@@ -0,0 +1,119 @@
+import json
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+from .caching import bump_feeds, post_feeds
+from .models import Post
+from .thumbnails import GEOMETRY
+
+# Ширины вариантов картинки поста; пропорции те же, что у миниатюры.
+WIDTHS = (320, 640, 960, 1440)
+# Ширина картинки в колонке на больших экранах: ее вариант идет в src.
+DEFAULT_WIDTH = 960
+# WebP для браузеров, которые его понимают, JPEG для остальных.
+FORMATS = (('webp', 'WEBP', 'webp'), ('jpg', 'JPEG', 'jpg'))
+RATIO = tuple(map(int, GEOMETRY.split('x')))
+
+
+def height(width):
+    return round(width * RATIO[1] / RATIO[0])
+
+
+def variant_name(name, width, extension):
+    return f'variants/{os.path.splitext(name)[0]}_{width}.{extension}'
+
+
+def supported_formats():
+    """Форматы, которые умеет сохранять установленный Pillow."""
+    return [
+        (extension, image_format)
+        for extension, image_format, feature in FORMATS
+        if features.check(feature)
+    ]
+
+
+def dump(name, widths, extensions):
+    """Манифест: имя исходной картинки, ширины и форматы вариантов."""
+    return json.dumps(
+        {'name': name, 'widths': widths, 'formats': extensions},
+        separators=(',', ':'),
+    )
+
+
+def build(name):
+    """Создает варианты всех ширин в WebP и JPEG и возвращает манифест.
+
+    Шире исходной картинки варианты не делаются, но самый узкий есть
+    всегда. Выполняется и в рабочих процессах, поэтому принимает имя.
+    """
+    with default_storage.open(name) as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image = image.convert('RGB')
+    widths = [width for width in WIDTHS if width <= image.width]
+    widths = widths or [WIDTHS[0]]
+    formats = supported_formats()
+    for width in widths:
+        variant = ImageOps.fit(image, (width, height(width)), Image.LANCZOS)
+        for extension, image_format in formats:
+            output = BytesIO()
+            variant.save(output, image_format, quality=settings.IMAGE_QUALITY)
+            target = variant_name(name, width, extension)
+            default_storage.delete(target)
+            default_storage.save(target, ContentFile(output.getvalue()))
+    return dump(name, widths, [extension for extension, _ in formats])
+
+
+def save_manifest(name, data):
+    """Записывает манифест постам с этой картинкой и сбрасывает их ленты."""
+    posts = list(
+        Post.objects.filter(image=name).select_related('author', 'group')
+    )
+    Post.objects.filter(pk__in=[post.pk for post in posts]).update(
+        image_variants=data
+    )
+    for post in posts:
+        bump_feeds(*post_feeds(post))
+
+
+def manifest(post):
+    """Манифест вариантов или None, если его нет или он устарел."""
+    if not post.image or not post.image_variants:
+        return None
+    try:
+        data = json.loads(post.image_variants)
+        if data['name'] == post.image.name:
+            return data
+    except (ValueError, TypeError, KeyError):
+        pass
+    return None
+
+
+def picture(post):
+    """srcset для каждого формата и запасная картинка для ``<img>``."""
+    data = manifest(post)
+    if data is None or 'jpg' not in data['formats']:
+        return None
+    available = data['widths']
+    url = post.image.storage.url
+    default = max(
+        [width for width in available if width <= DEFAULT_WIDTH]
+        or available[:1]
+    )
+    return {
+        'srcsets': {
+            extension: ', '.join(
+                f'{url(variant_name(post.image.name, width, extension))} '
+                f'{width}w'
+                for width in available
+            )
+            for extension in data['formats']
+        },
+        'src': url(variant_name(post.image.name, default, 'jpg')),
+        'width': default,
+        'height': height(default),
+    }
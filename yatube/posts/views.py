@@ -1,22 +1,49 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
+from django.db import transaction
+from django.http import Http404
 from django.shortcuts import render, get_object_or_404, redirect
+from core.replicas import replica_reads
+
 from .models import Post, Group, User, Follow
+from . import thumbnails
+from .exports import export_response
+from .caching import (
+    cache_feed, group_feed, post_feed, profile_feed
+)
+from .conditional import feed_condition, following_feeds, profile_feeds
 from .forms import PostForm, CommentForm
-from .utils import get_paginators_page
-
-
-@cache_page(20 * 10)
+from .profiles import profile_author
+from .recommendations import suggestions_for
+from .search import search as search_posts
+from .timelines import timeline_posts
+from .trending import current, top_groups, top_posts
+from .utils import (
+    FeedPaginator, get_comments_page, get_keyset_page, get_paginators_page
+)
+
+
+@replica_reads
+@feed_condition(lambda request: ['index'], per_user=True)
+@cache_feed('index', per_user=True)
 def index(request):
     post_list = Post.objects.select_related('author', 'group').all()
-    page_obj = get_paginators_page(post_list, request)
+    page_obj = get_keyset_page(post_list, request)
+    thumbnails.prime(page_obj)
     return render(request, 'posts/index.html', {'page_obj': page_obj})
 
 
+@replica_reads
+@feed_condition(
+    lambda request, slug: [group_feed(slug)], per_user=True
+)
+@cache_feed(group_feed, per_user=True)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     group_list = group.posts.select_related('author', 'group')
-    page_obj = get_paginators_page(group_list, request)
+    page_obj = get_keyset_page(group_list, request)
+    thumbnails.prime(page_obj)
     context = {
         'page_obj': page_obj,
         'group': group,
@@ -24,33 +51,109 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@replica_reads
+@feed_condition(profile_feeds, per_user=True)
+@cache_feed(profile_feed, per_user=True)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = profile_author(request, username)
     posts = author.posts.select_related('author', 'group')
-    page_obj = get_paginators_page(posts, request)
-    if (request.user.is_authenticated and author.following.exists()):
-        following = True
-    else:
-        following = False
+    page_obj = get_keyset_page(posts, request)
+    thumbnails.prime(page_obj)
     context = {
         'page_obj': page_obj,
         'author': author,
-        'following': following
+        'following': author.is_following,
+        'suggestions': suggestions_for(request.user, exclude=author.pk),
     }
     return render(request, 'posts/profile.html', context)
 
 
+def detail_post(request, post_id):
+    """Пост страницы, один раз за запрос: его же берет валидатор."""
+    if not hasattr(request, '_detail_post'):
+        request._detail_post = Post.objects.select_related(
+            'author__stats', 'group'
+        ).filter(pk=post_id).first()
+    return request._detail_post
+
+
+def post_detail_feeds(request, post_id):
+    """Сам пост и лента автора: на странице есть счетчик его постов."""
+    post = detail_post(request, post_id)
+    if post is None:
+        return [post_feed(post_id)]
+    return [post_feed(post_id), profile_feed(post.author.username)]
+
+
+@replica_reads
+@feed_condition(post_detail_feeds, per_user=True)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = detail_post(request, post_id)
+    if post is None:
+        raise Http404
     form = CommentForm(request.POST or None)
+    comments = get_comments_page(post, request)
     return render(
         request,
         'posts/post_detail.html',
         {'post': post,
-         'form': form}
+         'form': form,
+         'comments': comments}
     )
 
 
+@replica_reads
+@cache_feed(
+    'trending', timeout=settings.TRENDING_CACHE_TIMEOUT, per_user=True
+)
+def trending(request):
+    posts = list(top_posts())
+    thumbnails.prime(posts)
+    groups = list(top_groups())
+    for group in groups:
+        group.activity = current(group.trend)
+    return render(
+        request,
+        'posts/trending.html',
+        {'posts': posts, 'groups': groups}
+    )
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    results = None
+    if query:
+        results = search_posts(
+            query, request.GET.get('after'), settings.NUMBER_OF_POSTS
+        )
+    return render(
+        request,
+        'posts/search.html',
+        {'query': query, 'results': results}
+    )
+
+
+def profile_export(request, username, kind, file_format):
+    author = get_object_or_404(User, username=username)
+    if kind not in ('posts', 'comments'):
+        raise Http404
+    return export_response(
+        kind, file_format, f'{author.username}-{kind}', author=author
+    )
+
+
+def group_export(request, slug, file_format):
+    group = get_object_or_404(Group, slug=slug)
+    return export_response(
+        'posts', file_format, f'{group.slug}-posts', group=group
+    )
+
+
+@staff_member_required
+def site_export(request, kind, file_format):
+    return export_response(kind, file_format, kind)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -63,7 +166,8 @@ def post_create(request):
         return render(request, 'posts/create_post.html', {'form': form})
     post = form.save(commit=False)
     post.author = request.user
-    post.save()
+    with transaction.atomic():
+        post.save()
     return redirect('posts:profile', request.user.username)
 
 
@@ -98,18 +202,28 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@replica_reads
 @login_required
+@feed_condition(following_feeds, per_user=True)
 def follow_index(request):
-    follow_posts = (
-        Post.objects.select_related('author', 'group')
-        .filter(author__following__user=request.user).all()
+    follow_posts = timeline_posts(request.user).select_related(
+        'author', 'group'
     )
-    page_obj = get_paginators_page(follow_posts, request)
-    return render(request, 'posts/follow.html', {'page_obj': page_obj})
+    page_obj = get_paginators_page(
+        follow_posts, request, FeedPaginator.CACHED,
+        cache_key=f'follow:{request.user.pk}',
+    )
+    thumbnails.prime(page_obj)
+    context = {
+        'page_obj': page_obj,
+        'suggestions': suggestions_for(request.user),
+    }
+    return render(request, 'posts/follow.html', context)
 
 
 @login_required
@@ -120,13 +234,16 @@ def profile_follow(request, username):
         or request.user == author
     ):
         return redirect('posts:profile', username=username)
-    Follow.objects.create(user=request.user, author=author)
+    with transaction.atomic():
+        Follow.objects.create(user=request.user, author=author)
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    if Follow.objects.filter(user=request.user, author=author).exists():
-        Follow.objects.get(user=request.user, author=author).delete()
+    follow = Follow.objects.filter(user=request.user, author=author).first()
+    if follow is not None:
+        with transaction.atomic():
+            follow.delete()
     return redirect('posts:index')
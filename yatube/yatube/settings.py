@@ -35,6 +35,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -50,7 +52,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.InstrumentedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -75,6 +77,26 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения, например REPLICA_DATABASES=replica1,replica2.
+# Локально это копии db.sqlite3, их обновляет manage.py sync_replicas.
+REPLICA_DATABASES = [
+    alias for alias in os.getenv('REPLICA_DATABASES', '').split(',') if alias
+]
+for alias in REPLICA_DATABASES:
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db.{alias}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+# Модели, которые можно читать с реплик.
+REPLICA_APPS = ('posts', 'auth')
+# Сколько секунд после записи клиент читает только из основной базы.
+REPLICA_STICKY_SECONDS = 10
+# Страница, собранная по данным реплики, может отставать, поэтому
+# лента кэшируется на меньший срок.
+REPLICA_FEED_CACHE_TIMEOUT = 30
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -114,6 +136,9 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 NUMBER_OF_POSTS = 10
+NUMBER_OF_COMMENTS = 20
+# Сколько секунд paginator в режиме CACHED доверяет закэшированному COUNT.
+PAGINATOR_COUNT_TIMEOUT = 60
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
@@ -123,12 +148,82 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Обработка загруженных картинок: наибольшая сторона, качество JPEG
+# и WebP и предел числа пикселей, выше которого файл отклоняется.
+IMAGE_MAX_SIDE = 2048
+IMAGE_QUALITY = 85
+IMAGE_MAX_PIXELS = 40_000_000
+
+# Общий кэш всех процессов — memcached, например
+# CACHE_LOCATION=127.0.0.1:11211. Без него у каждого процесса свой
+# LocMemCache.
+CACHE_LOCATION = os.getenv('CACHE_LOCATION')
+if CACHE_LOCATION:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.InstrumentedMemcachedCache',
+            'LOCATION': CACHE_LOCATION,
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.InstrumentedLocMemCache',
+        }
+    }
+
+# Страницы лент сбрасываются сменой версии при изменении постов,
+# комментариев и подписок, поэтому в общем кэше их можно держать долго.
+# Версию в LocMemCache меняет только процесс, обработавший запись:
+# остальные узнают о ней, лишь когда их копия версии истечет, поэтому
+# там и страницы, и версии живут недолго.
+FEED_CACHE_TIMEOUT = 60 * 60 if CACHE_LOCATION else 60
+FEED_VERSION_TIMEOUT = None if CACHE_LOCATION else FEED_CACHE_TIMEOUT
 
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
+
+# Авторы с большим числом подписчиков не раскладывают посты по лентам,
+# их посты подтягиваются в ленту подписок при чтении. Пост автора, у
+# которого подписчиков не больше TIMELINE_INLINE_FANOUT_LIMIT,
+# раскладывается прямо в запросе, остальные — фоновой задачей.
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_INLINE_FANOUT_LIMIT = 100
+
+# Рекомендации «кого почитать» (manage.py build_suggestions): сколько
+# хранить на пользователя и сколько показывать. Запас нужен, чтобы
+# после новых подписок до следующего пересчета было что показать.
+SUGGESTIONS_STORED = 20
+SUGGESTIONS_SHOWN = 5
+
+# Популярное (posts.trending): за сколько часов вклад поста или
+# комментария падает вдвое и сколько постов и групп показывать.
+# Страница не сбрасывается при каждом комментарии, а живет в кэше
+# TRENDING_CACHE_TIMEOUT секунд.
+TRENDING_HALF_LIFE = 12
+TRENDING_POSTS = 10
+TRENDING_GROUPS = 5
+TRENDING_CACHE_TIMEOUT = 60
+
+# Фоновые задачи (core.tasks, manage.py run_workers). TASKS_EAGER = True
+# выполняет их после коммита в том же процессе, без исполнителей.
+# Задачи меняют версии лент (раскладка постов, варианты картинок), а
+# версию в LocMemCache исполнителя веб-процессы не видят и отдавали бы
+# старые страницы и 304 до ее истечения. Поэтому исполнители нужны
+# только с общим кэшем, без него задачи выполняются в веб-процессе.
+TASKS_EAGER = not CACHE_LOCATION
+# Пауза перед первым повтором, дальше она удваивается.
+TASK_RETRY_DELAY = 30
+# Задачу, которую исполнитель держит дольше, считаем брошенной.
+TASK_LOCK_TIMEOUT = 10 * 60
+TASK_KEEP_DAYS = 7
+TASK_SCHEDULE = {
+    'reconcile-counters': {
+        'task': 'posts.tasks.reconcile_counters', 'cron': '30 3 * * *',
+    },
+    'build-suggestions': {
+        'task': 'posts.tasks.build_suggestions', 'cron': '0 5 * * *',
+    },
+    'purge-tasks': {'task': 'core.tasks.purge_tasks', 'cron': '0 4 * * *'},
+}